@@ -1,10 +1,16 @@
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import pandas as pd
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 import os
 import shutil
+import asyncio
+import threading
 import random
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
 
 # ─── New Service Imports ───
@@ -12,7 +18,7 @@ from services.ingestion import GSTIngestionService
 from services.reconciliation import ReconciliationEngine
 from services.fraud import FraudDetectionEngine
 from services.risk import RiskScoringEngine
-from services.explain import ExplainableAIService
+from services.explain import ExplainableAIService, LLMStreamError
 from services.nl_query import NLQueryEngine
 from services.alerts import AlertService
 from services.anomaly import AnomalyDetectionService
@@ -20,6 +26,14 @@ from services.xgboost_classifier import XGBoostFraudClassifier
 from services.neo4j_driver import health_check as neo4j_health_check, close_driver as neo4j_close, create_indexes
 from datetime import datetime
 import json
+import hashlib
+from collections import OrderedDict, deque
+
+try:
+    import pyarrow  # noqa: F401 — only needed for read_csv's multithreaded pyarrow engine
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
 
 load_dotenv()  # Load variables from .env
 
@@ -41,7 +55,7 @@ def shutdown_event():
     print("🔌 Neo4j connection closed")
 
 # ─── Audit Trail ───
-_audit_log = []
+_audit_log = deque(maxlen=500)  # Keep last 500 entries
 
 def _log_audit(action: str, details: str = ""):
     """Log an API action with timestamp."""
@@ -52,11 +66,16 @@ def _log_audit(action: str, details: str = ""):
         "details": details,
     }
     _audit_log.append(entry)
-    if len(_audit_log) > 500:
-        _audit_log.pop(0)  # Keep last 500 entries
 
-# ─── AI Response Cache ───
-_ai_cache = {}
+# ─── AI Response Cache (evidence hash → insight, LRU) ───
+_ai_cache = OrderedDict()
+AI_CACHE_SIZE = 128
+
+# ─── Parsed CSV Cache (path → (mtime, DataFrame)) ───
+_df_cache = {}
+
+# ─── Fraud Analytics Cache (GSTR-1 DataFrame → circular-trading results) ───
+_fraud_cache = {}
 
 app.add_middleware(
     CORSMiddleware,
@@ -66,6 +85,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Columns the graph endpoints read from each upload, with fixed dtypes
+# (skips dtype inference; GSTR-1/2B GSTINs become categorical codes)
+CSV_SCHEMA = {
+    "taxpayers": {"gstin": "str", "legal_name": "str", "status": "str", "trust_score": "float64"},
+    "gstr1": {"invoice_id": "str", "supplier_gstin": "category", "receiver_gstin": "category", "total_value": "float64"},
+    "gstr2b": {"invoice_id": "str", "supplier_gstin": "category", "receiver_gstin": "category", "total_value": "float64"},
+    "gstr3b": {"gstin": "str", "tax_paid_cash": "float64", "total_sales_declared": "float64"},
+    "fraud_labels": {"gstin": "str", "is_fraud": "float64", "fraud_type": "str"},
+}
+
+GSTIN_COLUMNS = {
+    "taxpayers": ["gstin"],
+    "gstr1": ["supplier_gstin", "receiver_gstin"],
+    "gstr2b": ["supplier_gstin", "receiver_gstin"],
+    "gstr3b": ["gstin"],
+    "fraud_labels": ["gstin"],
+}
+
+CHUNKED_READ_BYTES = 256 * 1024 * 1024  # Invoice CSVs above this are streamed in chunks
+CSV_CHUNK_ROWS = 256_000
+
+def _read_csv_chunked(path, schema):
+    """
+    Stream a large CSV in row chunks, folding each chunk in as it is read: categorical
+    columns keep only integer codes against a growing category index, so a chunk's
+    raw strings are released before the next chunk is parsed.
+    """
+    categories = {}  # categorical column → categories seen so far, in first-appearance order
+    codes = {}       # categorical column → per-chunk code arrays against those categories
+    pieces = {}      # other columns → per-chunk Series, joined once at the end
+    order = []       # column order of the file, as the chunks deliver it
+    for chunk in pd.read_csv(path, usecols=list(schema), dtype=schema, chunksize=CSV_CHUNK_ROWS):
+        order = list(chunk.columns)
+        for col in order:
+            values = chunk[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                chunk_categories = values.cat.categories
+                seen = categories.get(col, chunk_categories[:0])
+                seen = seen.append(chunk_categories[~chunk_categories.isin(seen)])
+                categories[col] = seen
+                # Re-map chunk-local codes onto the accumulated categories; -1 (missing) stays -1
+                mapping = np.append(seen.get_indexer(chunk_categories), -1)
+                codes.setdefault(col, []).append(mapping[values.cat.codes.to_numpy()].astype(np.int32))
+            else:
+                pieces.setdefault(col, []).append(values)
+        del chunk, values
+    if not order:
+        return pd.read_csv(path, usecols=list(schema), dtype=schema)
+
+    # Numeric pieces are copied once here; pyarrow-backed string pieces are joined as chunks
+    columns = {}
+    for col in order:
+        if col in categories:
+            columns[col] = pd.Categorical.from_codes(np.concatenate(codes.pop(col)), categories[col])
+        else:
+            columns[col] = pd.concat(pieces.pop(col), ignore_index=True)
+    return pd.DataFrame(columns)
+
+def _share_gstin_categories(data):
+    """Recast every GSTIN column to one shared CategoricalDtype so codes agree across tables."""
+    cols = [(key, col) for key, names in GSTIN_COLUMNS.items() for col in names if col in data[key].columns]
+    if not cols:
+        return
+    all_gstins = pd.concat([data[key][col].astype(object) for key, col in cols]).dropna().unique()
+    gstin_dtype = pd.CategoricalDtype(all_gstins)
+    for key, col in cols:
+        data[key] = data[key].assign(**{col: data[key][col].astype(gstin_dtype)})
+
 def load_data():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_dir, "../uploads")
@@ -80,75 +167,215 @@ def load_data():
     }
     
     data = {}
+    mtimes = {}
+    reparsed = False
     for key, path in paths.items():
         try:
-            data[key] = pd.read_csv(path)
+            mtime = os.path.getmtime(path)
         except FileNotFoundError:
             data[key] = pd.DataFrame() # Return empty if not uploaded yet
+            if _df_cache.pop(path, None) is not None:
+                reparsed = True
+            continue
+
+        # Only re-parse a CSV when it has changed on disk since the last request
+        cached = _df_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            header = pd.read_csv(path, nrows=0).columns
+            schema = {col: dtype for col, dtype in CSV_SCHEMA[key].items() if col in header}
+            if key in ("gstr1", "gstr2b") and os.path.getsize(path) > CHUNKED_READ_BYTES:
+                df = _read_csv_chunked(path, schema)
+            else:
+                df = pd.read_csv(path, usecols=list(schema), dtype=schema, engine=CSV_ENGINE)
+            cached = (mtime, df)
+            reparsed = True
+        data[key] = cached[1]
+        mtimes[key] = cached[0]
+
+    # A changed file can add GSTINs, so re-share the categories and cache the recast frames
+    if reparsed:
+        _share_gstin_categories(data)
+        for key, mtime in mtimes.items():
+            _df_cache[paths[key]] = (mtime, data[key])
             
     return data
 
 # --- UPGRADED ALGORITHM: DFS Cycle Detection ---
-def detect_circular_trading(df_gstr1, value_threshold=20000000):
-    graph = {}
+MAX_CYCLE_LENGTH = 8  # ITC carousel rings are short; bounds the DFS on dense graphs
+WHITE, GRAY, BLACK = 0, 1, 2  # DFS node colors
+
+def detect_circular_trading(df_gstr1, value_threshold=20000000, max_depth=None):
     if df_gstr1.empty:
         return set()
-        
-    for _, row in df_gstr1.iterrows():
-        seller = row.get('supplier_gstin')
-        buyer = row.get('receiver_gstin')
-        inv_no = row.get('invoice_id')
-        val = row.get('total_value', 0)
-        
-        if seller not in graph:
-            graph[seller] = []
-        graph[seller].append((buyer, inv_no, val))
-
-    visited = set()
-    rec_stack = set()
-    fraud_invoices = set()
-    path = []
-
-    def dfs(node):
-        visited.add(node)
-        rec_stack.add(node)
-
-        if node in graph:
-            for neighbor, inv_no, val in graph[node]:
-                path.append((node, neighbor, inv_no, val))
-                
-                if neighbor not in visited:
-                    dfs(neighbor)
-                elif neighbor in rec_stack:
-                    idx = len(path) - 1
-                    cycle_invoices = []
-                    cycle_value = 0
-                    
-                    while idx >= 0:
-                        u, v, i_no, i_val = path[idx]
-                        cycle_invoices.append(i_no)
-                        cycle_value += i_val
-                        if u == neighbor: 
-                            break
-                        idx -= 1
-                    
-                    if cycle_value >= value_threshold:
-                        for c_inv in cycle_invoices:
-                            fraud_invoices.add(c_inv)
-                
-                path.pop()
-        rec_stack.remove(node)
 
-    for node in list(graph.keys()):
-        if node not in visited:
-            dfs(node)
+    sellers = df_gstr1['supplier_gstin']
+    buyers = df_gstr1['receiver_gstin']
+    if isinstance(sellers.dtype, pd.CategoricalDtype) and sellers.dtype == buyers.dtype:
+        sellers, buyers = sellers.cat.codes, buyers.cat.codes  # shared GSTIN categories → factorize ints
+    inv_nos = df_gstr1['invoice_id'].to_numpy()
+    vals = df_gstr1['total_value'].to_numpy(dtype=float) if 'total_value' in df_gstr1.columns else np.zeros(len(df_gstr1))
+
+    # CSR adjacency over integer node ids. Sellers are factorized first, so ids
+    # 0..n_sellers-1 follow first-seen seller order; each seller's edges keep row order.
+    n_edges = len(df_gstr1)
+    codes, _ = pd.factorize(np.concatenate([sellers.to_numpy(), buyers.to_numpy()]), use_na_sentinel=False)
+    src, dst = codes[:n_edges], codes[n_edges:]
+    n_sellers = int(src.max()) + 1
+    n_nodes = int(codes.max()) + 1
+
+    # Cycles never leave a strongly connected component, so only edges whose two ends
+    # share an SCC can be on one (self-loops included); the DFS skips the rest.
+    adjacency = csr_matrix((np.ones(n_edges, dtype=bool), (src, dst)), shape=(n_nodes, n_nodes))
+    _, scc = connected_components(adjacency, directed=True, connection='strong')
+    rows = np.flatnonzero(scc[src] == scc[dst])
+    if len(rows) == 0:
+        return set()
+    src, dst, vals = src[rows], dst[rows], vals[rows]
+    n_edges = len(rows)
+
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    indptr = indptr.tolist()
+    edge_dst = dst[order].tolist()
+    edge_val = vals[order].tolist()
+    max_val = float(vals.max())
+
+    color = bytearray(n_nodes)     # WHITE (unvisited) / GRAY (on the DFS stack) / BLACK (finished)
+    depth = [0] * n_nodes          # path position of the edge leaving a node on the DFS stack
+    flagged = bytearray(n_edges)   # CSR edge positions that close a qualifying cycle
+    path = []                      # CSR edge positions from the DFS root to the current node
+    prefix = [0.0]                 # prefix[i] = total value of path[:i]
+    run_start = []                 # per path position: where the flagged run ending there starts, or -1
+
+    # Iterative DFS: an explicit stack of [node, next edge position] so long
+    # invoice chains can't hit Python's recursion limit.
+    for root in range(n_sellers):
+        if color[root] != WHITE:
+            continue
+        color[root] = GRAY
+        depth[root] = 0
+        stack = [[root, indptr[root]]]
+
+        while stack:
+            frame = stack[-1]
+            node, e = frame
+            if e == indptr[node + 1]:
+                stack.pop()
+                color[node] = BLACK
+                if stack:
+                    # drop the edge we came in on
+                    path.pop()
+                    prefix.pop()
+                    run_start.pop()
+                continue
+
+            frame[1] = e + 1
+            neighbor = edge_dst[e]
+            path.append(e)
+            prefix.append(prefix[-1] + edge_val[e])
+            run_start.append(-1)
+
+            if color[neighbor] == WHITE:
+                # Depth / value cutoff: don't descend past max_depth hops, or where even
+                # max-value edges for the remaining hops couldn't lift a cycle through
+                # this path to value_threshold. The neighbor stays WHITE and is
+                # explored later from a shallower path or as its own root.
+                if max_depth is not None and (
+                    len(path) >= max_depth
+                    or prefix[-1] + (max_depth - len(path)) * max_val < value_threshold
+                ):
+                    path.pop()
+                    prefix.pop()
+                    run_start.pop()
+                    continue
+                color[neighbor] = GRAY
+                depth[neighbor] = len(path)
+                stack.append([neighbor, indptr[neighbor]])
+                continue
+
+            if color[neighbor] == GRAY:
+                # Back edge: the cycle is exactly path[depth[neighbor]:], so its value
+                # comes from the prefix sums and its edges are spliced off the stack
+                # top-down, jumping over runs an earlier cycle already flagged.
+                start = depth[neighbor]
+                if prefix[-1] - prefix[start] >= value_threshold:
+                    k = len(path) - 1
+                    while k >= start:
+                        r = run_start[k]
+                        if r == -1:
+                            flagged[path[k]] = 1
+                            run_start[k] = start
+                            k -= 1
+                        elif r <= start:
+                            break
+                        else:
+                            k = r - 1
+
+            path.pop()
+            prefix.pop()
+            run_start.pop()
+
+    flagged_edges = rows[order[np.flatnonzero(np.frombuffer(flagged, dtype=np.uint8))]]
+    return set(inv_nos[flagged_edges])
+
+def _fraud_aggregates(df_gstr1, is_fraud):
+    """Fraud GSTINs, per-seller fraudulent outward value (Series) and total value for the rows flagged in is_fraud."""
+    fraud_rows = df_gstr1[is_fraud]
+    fraud_gstins = set(fraud_rows[['supplier_gstin', 'receiver_gstin']].to_numpy().ravel())
+    fraud_out_value = fraud_rows.groupby('supplier_gstin', sort=False, observed=True)['total_value'].sum()
+    return fraud_gstins, fraud_out_value, fraud_rows['total_value'].sum()
+
+def _compute_fraud_analytics(df_gstr1):
+    """Circular-trading results for a GSTR-1 frame, shared by /api/graph-data and /api/ai-insight."""
+    # load_data hands back the same DataFrame object until a CSV changes, so identity is the cache key
+    cached = _fraud_cache.get("gstr1")
+    if cached is not None and cached[0] is df_gstr1:
+        return cached[1]
 
-    return fraud_invoices
+    suspicious_invoices = df_gstr1[df_gstr1['total_value'] > 1000000]
+    fraudulent_invoice_ids = detect_circular_trading(suspicious_invoices, value_threshold=0, max_depth=MAX_CYCLE_LENGTH)
+
+    # Stringify invoice ids once; reused for the fraud mask, phantom check and link labels
+    inv_ids = df_gstr1['invoice_id'].astype(str)
+    is_circular = inv_ids.isin(fraudulent_invoice_ids).to_numpy()
+    fraud_gstins, fraud_out_value, total_fraud_value = _fraud_aggregates(df_gstr1, is_circular)
+
+    analytics = {
+        "fraudulent_ids": fraudulent_invoice_ids,
+        "invoice_ids": inv_ids,
+        "is_circular": is_circular,
+        "fraud_gstins": fraud_gstins,
+        "fraud_out_value": fraud_out_value.to_dict(),
+        "total_fraud_value": total_fraud_value,
+        "mastermind": fraud_out_value.idxmax() if len(fraud_out_value) else None,
+    }
+    _fraud_cache["gstr1"] = (df_gstr1, analytics)
+    return analytics
+
+def _join_on_gstin(df, other, defaults):
+    """Left-join the `defaults` columns of `other` onto df by GSTIN; unmatched rows get the default."""
+    found = np.zeros(len(df), dtype=bool)
+    if not other.empty:
+        cols = [c for c in defaults if c in other.columns]
+        df = df.merge(other[['gstin', *cols]], on='gstin', how='left', indicator='_matched')
+        found = (df.pop('_matched') == 'both').to_numpy()
+    for col, default in defaults.items():
+        values = df[col].where(found, default) if col in df.columns else default
+        df = df.assign(**{col: values})
+    return df
 
 @app.get("/")
 def read_root():
     return {"status": "GSTGraph AI Backend is running 🟢"}
 
+UPLOAD_COPY_BUFFER = 4 * 1024 * 1024  # 4 MiB reads instead of copyfileobj's small default
+
+def _save_upload(upload_file, file_path):
+    """Stream an uploaded file to disk."""
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload_file.file, buffer, length=UPLOAD_COPY_BUFFER)
+
 @app.post("/api/upload")
 async def upload_files(
     taxpayers: UploadFile = File(...),
@@ -170,10 +397,12 @@ async def upload_files(
         "fraud_labels.csv": fraud_labels
     }
 
-    for filename, upload_file in files_to_save.items():
-        file_path = os.path.join(data_dir, filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+    # Copy all five files concurrently in worker threads so the event loop stays free
+    await asyncio.gather(*(
+        asyncio.to_thread(_save_upload, upload_file, os.path.join(data_dir, filename))
+        for filename, upload_file in files_to_save.items()
+    ))
+    _df_cache.clear()  # don't rely on mtime resolution to notice a same-second re-upload
 
     _log_audit("DATA_UPLOAD", "5 CSV files uploaded via UI")
     return get_graph_data()
@@ -191,138 +420,116 @@ def get_graph_data():
         return {"nodes": [], "links": []}
 
     # 1. Base Graph Analytics
-    suspicious_invoices = df_gstr1[df_gstr1['total_value'] > 1000000]
-    fraudulent_invoice_ids = detect_circular_trading(suspicious_invoices, value_threshold=0)
-
-    fraud_gstins = set()
-    fraud_out_value = {}
-    for _, row in df_gstr1.iterrows():
-        if str(row['invoice_id']) in fraudulent_invoice_ids:
-            seller = row['supplier_gstin']
-            val = row['total_value']
-            fraud_gstins.add(seller)
-            fraud_gstins.add(row['receiver_gstin'])
-            fraud_out_value[seller] = fraud_out_value.get(seller, 0) + val
-
-    mastermind_gstin = max(fraud_out_value, key=fraud_out_value.get) if fraud_out_value else None
-
-    # 2. Lookups for 3B and Fraud Labels
-    dict_3b = df_gstr3b.set_index('gstin').to_dict('index') if not df_gstr3b.empty else {}
-    dict_labels = df_labels.set_index('gstin').to_dict('index') if not df_labels.empty else {}
+    analytics = _compute_fraud_analytics(df_gstr1)
+    inv_ids = analytics["invoice_ids"]
+    is_circular = analytics["is_circular"]
+    fraud_gstins = analytics["fraud_gstins"]
+    mastermind_gstin = analytics["mastermind"]
+
+    # 2. Join 3B figures and fraud labels onto the taxpayer table
+    enriched = _join_on_gstin(df_taxpayers, df_gstr3b, {'tax_paid_cash': -1, 'total_sales_declared': 0})
+    enriched = _join_on_gstin(enriched, df_labels, {'is_fraud': 0, 'fraud_type': 'None'})
     
     # 3. Mismatch Detection (In 2B but not in 1)
-    gstr1_ids = set(df_gstr1['invoice_id'].astype(str)) if not df_gstr1.empty else set()
-
-    nodes = []
-    for _, row in df_taxpayers.iterrows():
-        gstin = row['gstin']
-        trust = float(row.get('trust_score', random.uniform(0.1, 0.9)))
-        
-        # Pull data from 3B and Labels
-        node_3b = dict_3b.get(gstin, {})
-        cash_paid = node_3b.get('tax_paid_cash', -1)
-        sales_declared = node_3b.get('total_sales_declared', 0)
-        
-        node_label = dict_labels.get(gstin, {})
-        is_known_fraud = node_label.get('is_fraud', 0) == 1
-        fraud_type = node_label.get('fraud_type', 'None')
+    # Factorize GSTR-1 ids once; a GSTR-2B id with no code there is a phantom claim
+    _, gstr1_ids = pd.factorize(inv_ids)
+
+    gstins = enriched['gstin']
+    if 'trust_score' in enriched.columns:
+        trust = enriched['trust_score'].astype(float)
+    else:
+        trust = pd.Series([random.uniform(0.1, 0.9) for _ in range(len(enriched))], index=enriched.index)
+    cash_paid = enriched['tax_paid_cash']
+    fraud_type = enriched['fraud_type']
+    is_mastermind = (gstins == mastermind_gstin).to_numpy()
+
+    # With load_data's shared GSTIN categories, fraud membership is a bitmap lookup on
+    # the category codes (the extra last slot is where a NaN's -1 code lands)
+    if isinstance(gstins.dtype, pd.CategoricalDtype) and df_gstr1['supplier_gstin'].dtype == gstins.dtype:
+        fraud_rows = df_gstr1[is_circular]
+        fraud_mask = np.zeros(len(gstins.cat.categories) + 1, dtype=bool)
+        fraud_mask[fraud_rows['supplier_gstin'].cat.codes.to_numpy()] = True
+        fraud_mask[fraud_rows['receiver_gstin'].cat.codes.to_numpy()] = True
+        in_fraud_ring = fraud_mask[gstins.cat.codes.to_numpy()]
+    else:
+        in_fraud_ring = gstins.isin(fraud_gstins).to_numpy()
+
+    # 🚨 ADVANCED RISK CALCULATION 🚨
+    # High sales but ₹0 cash paid (100% ITC utilization) = Shell Company Behavior
+    risk = np.select(
+        [
+            (enriched['is_fraud'] == 1).to_numpy() | in_fraud_ring,
+            (cash_paid == 0) & (enriched['total_sales_declared'] > 5000000),
+        ],
+        ["critical", "high"],
+        default=np.where(trust < 0.5, "warning", "normal"),
+    )
+    is_critical = risk == "critical"
 
-        is_mastermind = (gstin == mastermind_gstin)
-        
-        # 🚨 ADVANCED RISK CALCULATION 🚨
-        if is_known_fraud or gstin in fraud_gstins:
-            risk = "critical"
-        elif cash_paid == 0 and sales_declared > 5000000:
-            # High sales but ₹0 cash paid (100% ITC utilization) = Shell Company Behavior
-            risk = "high"
-        else:
-            risk = "warning" if trust < 0.5 else "normal"
-
-        if is_mastermind:
-            icon = "🚫"
-            label_text = "🚨 MASTERMIND"
-        elif risk == "critical":
-            icon = "🛑"
-            label_text = fraud_type if fraud_type != 'None' else "FRAUD"
-        else:
-            icon = "🏢"
-            label_text = str(row['legal_name'])[:15] + ".."
-            if risk != "critical" and row['status'] != "Active":
-                icon = "🔒"
-
-        nodes.append({
-            "id": gstin,
-            "label": label_text, 
-            "riskLevel": risk,
-            "trustScore": trust,
-            "status": row['status'],
-            "cashPaid": cash_paid,
-            "icon": icon,
-            "isCentral": is_mastermind
-        })
+    icon = np.select(
+        [is_mastermind, is_critical, enriched['status'] != "Active"],
+        ["🚫", "🛑", "🔒"],
+        default="🏢",
+    )
+    label_text = np.select(
+        [is_mastermind, is_critical & (fraud_type != 'None'), is_critical],
+        ["🚨 MASTERMIND", fraud_type, "FRAUD"],
+        default=enriched['legal_name'].map(str).str[:15] + "..",
+    )
 
-    links = []
-    for _, row in df_gstr1.iterrows():
-        inv_id = str(row['invoice_id'])
-        is_circular = inv_id in fraudulent_invoice_ids
-        
-        links.append({
-            "source": row['supplier_gstin'],
-            "target": row['receiver_gstin'],
-            "value": 4 if is_circular else 1,
-            "isRisk": is_circular,
-            "isMismatched": False, # Exists in GSTR-1, so it's a declared outward supply
-            "invoice_no": inv_id,
-            "total_value": row['total_value']
-        })
+    nodes = pd.DataFrame({
+        "id": gstins,
+        "label": label_text,
+        "riskLevel": risk,
+        "trustScore": trust,
+        "status": enriched['status'],
+        "cashPaid": cash_paid,
+        "icon": icon,
+        "isCentral": is_mastermind,
+    }).to_dict('records')
+
+    links = pd.DataFrame({
+        "source": df_gstr1['supplier_gstin'],
+        "target": df_gstr1['receiver_gstin'],
+        "value": np.where(is_circular, 4, 1),
+        "isRisk": is_circular,
+        "isMismatched": False, # Exists in GSTR-1, so it's a declared outward supply
+        "invoice_no": inv_ids,
+        "total_value": df_gstr1['total_value'],
+    }).to_dict('records')
         
     # Add phantom links for fake ITC claims (In 2B but not in 1)
     if not df_gstr2b.empty:
-        for _, row in df_gstr2b.iterrows():
-            inv_id = str(row['invoice_id'])
-            if inv_id not in gstr1_ids:
-                links.append({
-                    "source": row['supplier_gstin'],
-                    "target": row['receiver_gstin'],
-                    "value": 2,
-                    "isRisk": True,
-                    "isMismatched": True, # Fake ITC Claim!
-                    "invoice_no": inv_id,
-                    "total_value": row['total_value']
-                })
+        inv_ids_2b = df_gstr2b['invoice_id'].astype(str)
+        phantom = pd.Categorical(inv_ids_2b, categories=gstr1_ids).codes == -1
+        links += pd.DataFrame({
+            "source": df_gstr2b.loc[phantom, 'supplier_gstin'],
+            "target": df_gstr2b.loc[phantom, 'receiver_gstin'],
+            "value": 2,
+            "isRisk": True,
+            "isMismatched": True, # Fake ITC Claim!
+            "invoice_no": inv_ids_2b[phantom],
+            "total_value": df_gstr2b.loc[phantom, 'total_value'],
+        }).to_dict('records')
 
     return {"nodes": nodes, "links": links}
 
-@app.get("/api/ai-insight")
-def get_ai_insight():
+def _ai_insight_evidence():
+    """Run the circular-trading analysis behind /api/ai-insight; returns a final response if there is nothing to summarize."""
     data = load_data()
     df_gstr1 = data["gstr1"]
     
     if df_gstr1.empty:
         return {"insight": "Data pipeline offline. Cannot generate insights.", "fraud_table": []}
 
-    suspicious_invoices = df_gstr1[df_gstr1['total_value'] > 1000000]
-    fraudulent_invoice_ids = detect_circular_trading(suspicious_invoices, value_threshold=0)
-
-    if not fraudulent_invoice_ids:
+    analytics = _compute_fraud_analytics(df_gstr1)
+    if not analytics["fraudulent_ids"]:
         return {"insight": "Graph is currently stable. No systemic circular trading detected.", "fraud_table": []}
 
-    total_fraud_value = 0
-    fraud_nodes = set()
-    fraud_out_value = {}
-
-    for _, row in df_gstr1.iterrows():
-        if str(row['invoice_id']) in fraudulent_invoice_ids:
-            seller = row['supplier_gstin']
-            buyer = row['receiver_gstin']
-            val = row['total_value']
-            
-            total_fraud_value += val
-            fraud_nodes.add(seller)
-            fraud_nodes.add(buyer)
-            fraud_out_value[seller] = fraud_out_value.get(seller, 0) + val
-
-    mastermind = max(fraud_out_value, key=fraud_out_value.get) if fraud_out_value else "Unknown"
+    fraud_nodes = analytics["fraud_gstins"]
+    fraud_out_value = analytics["fraud_out_value"]
+    total_fraud_value = analytics["total_fraud_value"]
+    mastermind = analytics["mastermind"] if analytics["mastermind"] is not None else "Unknown"
 
     # 🔥 NEW: Build the structured data for the React Table!
     fraud_table_data = []
@@ -340,6 +547,33 @@ def get_ai_insight():
     # Sort the table so the Mastermind is always at the top
     fraud_table_data.sort(key=lambda x: x['fake_outward_value'], reverse=True)
 
+    return {
+        "mastermind": mastermind,
+        "total_fraud_value": total_fraud_value,
+        "fraud_nodes": fraud_nodes,
+        "fraud_table": fraud_table_data,
+    }
+
+@app.get("/api/ai-insight")
+async def get_ai_insight():
+    # The graph analysis is CPU-bound, so it runs in a worker thread; the Groq call is
+    # awaited, so neither holds up the event loop
+    evidence = await asyncio.to_thread(_ai_insight_evidence)
+    if "insight" in evidence:
+        return evidence
+
+    mastermind = evidence["mastermind"]
+    total_fraud_value = evidence["total_fraud_value"]
+    fraud_nodes = evidence["fraud_nodes"]
+    fraud_table_data = evidence["fraud_table"]
+
+    # Same evidence → same insight: skip the Groq round-trip on unchanged data
+    evidence = f"{mastermind}|{total_fraud_value:.0f}|{','.join(sorted(map(str, fraud_nodes)))}"
+    cache_key = hashlib.blake2b(evidence.encode(), digest_size=16).hexdigest()
+    if cache_key in _ai_cache:
+        _ai_cache.move_to_end(cache_key)
+        return _ai_cache[cache_key]
+
     prompt = f"""
     You are an expert Goods and Services Tax (GST) Intelligence Officer in India.
     Our graph database just detected a circular trading ring designed to manipulate Input Tax Credit (ITC).
@@ -360,8 +594,8 @@ def get_ai_insight():
     """
 
     try:
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        chat_completion = client.chat.completions.create(
+        client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+        chat_completion = await client.chat.completions.create(
             messages=[
                 {"role": "system", "content": "You are an expert Goods and Services Tax (GST) Intelligence Officer."},
                 {"role": "user", "content": prompt}
@@ -380,7 +614,9 @@ def get_ai_insight():
             "model": "llama-3.3-70b-versatile",
             "generated_at": datetime.utcnow().isoformat(),
         }
-        _ai_cache["last_insight"] = result
+        _ai_cache[cache_key] = result
+        if len(_ai_cache) > AI_CACHE_SIZE:
+            _ai_cache.popitem(last=False)
         _log_audit("AI_INSIGHT_GENERATED", f"Confidence: {confidence}%, Fraud Value: ₹{total_fraud_value:,.2f}")
         return result
         
@@ -412,13 +648,80 @@ _nl_query_engine = NLQueryEngine()
 _alert_service = AlertService()
 
 
+# Engine instances and their results, reused until the service data is rebuilt.
+# A (re)load swaps in a fresh dict instead of clearing this one, so a request still
+# computing on the old data writes its result into the discarded dict, never the live one
+_compute_cache = {}
+
+
+# Serializes service (re)loads so concurrent cold requests trigger one graph rebuild
+_load_lock = threading.Lock()
+
+
+def _reset_compute_cache():
+    """Start a fresh compute cache for the current _service (call after swapping/loading it)."""
+    global _compute_cache
+    _compute_cache = {}
+
+
+def _cached(key: str, compute):
+    """Cached value for key, computing it from the current service data on a miss."""
+    cache = _compute_cache  # captured before compute() reads _service; see _compute_cache
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
 def _ensure_service_loaded():
     """Load data into the service if not already loaded."""
-    if not _service.has_data():
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_dir = os.path.join(base_dir, "../uploads")
-        _service.load_from_disk(data_dir)
-        _service.rebuild_graph()
+    if _service.has_data():
+        return
+    with _load_lock:
+        if not _service.has_data():
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            data_dir = os.path.join(base_dir, "../uploads")
+            _reset_compute_cache()
+            _service.load_from_disk(data_dir)
+            _service.rebuild_graph()
+            # Drop anything computed from the half-loaded service while it was filling in
+            _reset_compute_cache()
+
+
+def _get_recon_engine() -> ReconciliationEngine:
+    """Reconciliation engine over the loaded data, reconciled once per data load."""
+    def build():
+        recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
+        recon.full_chain_reconciliation()
+        return recon
+    return _cached("recon", build)
+
+
+def _cached_mismatches() -> list:
+    """Reconciliation mismatches for the loaded data."""
+    return _cached("mismatches", lambda: _get_recon_engine().get_mismatches())
+
+
+def _get_fraud_engine() -> FraudDetectionEngine:
+    """Fraud detection engine over the loaded data."""
+    return _cached("fraud", lambda: FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df))
+
+
+def _cached_fraud_patterns() -> dict:
+    """Combined fraud patterns for the loaded data."""
+    return _cached("fraud_patterns", lambda: _get_fraud_engine().detect_all_patterns())
+
+
+def _get_risk_engine() -> RiskScoringEngine:
+    """Risk scoring engine over the loaded data (keeps its PageRank cache between requests)."""
+    return _cached("risk", lambda: RiskScoringEngine(
+        _service.gstr1_df, _service.gstr2b_df,
+        _service.gstr3b_df, _service.fraud_labels_df
+    ))
+
+
+def _cached_leaderboard() -> list:
+    """Top risky vendors for the loaded data."""
+    return _cached("leaderboard", lambda: _get_risk_engine().get_leaderboard())
 
 
 @app.get("/api/v1/stats")
@@ -432,15 +735,13 @@ def get_stats():
     ]) if not _service.taxpayers_df.empty and "status" in _service.taxpayers_df.columns else 0
 
     # Run reconciliation for mismatch count
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon_summary = recon.get_summary()
+    recon_summary = _get_recon_engine().get_summary()
 
     # Run fraud detection for fraud count
-    fraud_engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
-    fraud_patterns = fraud_engine.detect_all_patterns()
+    fraud_patterns = _cached_fraud_patterns()
 
     # Generate alerts
-    mismatches = recon.get_mismatches()
+    mismatches = _cached_mismatches()
     alerts = _alert_service.generate_alerts(mismatches, fraud_patterns)
 
     return {
@@ -462,11 +763,9 @@ def get_stats():
 def run_reconciliation():
     """Run full chain reconciliation."""
     _ensure_service_loaded()
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon.full_chain_reconciliation()
     return {
-        "summary": recon.get_summary(),
-        "mismatches": recon.get_mismatches(),
+        "summary": _get_recon_engine().get_summary(),
+        "mismatches": _cached_mismatches(),
     }
 
 
@@ -474,11 +773,9 @@ def run_reconciliation():
 def get_mismatches():
     """Get all reconciliation mismatches."""
     _ensure_service_loaded()
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon.full_chain_reconciliation()
     return {
-        "summary": recon.get_summary(),
-        "mismatches": recon.get_mismatches(),
+        "summary": _get_recon_engine().get_summary(),
+        "mismatches": _cached_mismatches(),
     }
 
 
@@ -486,7 +783,7 @@ def get_mismatches():
 def get_circular_trades():
     """Detect circular trading patterns."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
+    engine = _get_fraud_engine()
     return {"circular_trades": engine.detect_circular_trading()}
 
 
@@ -494,7 +791,7 @@ def get_circular_trades():
 def get_shell_companies():
     """Detect suspected shell companies."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
+    engine = _get_fraud_engine()
     return {"shell_companies": engine.detect_shell_companies()}
 
 
@@ -502,7 +799,7 @@ def get_shell_companies():
 def get_reciprocal_trades():
     """Detect reciprocal trading pairs."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
+    engine = _get_fraud_engine()
     return {"reciprocal_trades": engine.detect_reciprocal_trading()}
 
 
@@ -510,7 +807,7 @@ def get_reciprocal_trades():
 def get_fake_invoices():
     """Detect fake invoice patterns."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
+    engine = _get_fraud_engine()
     return {"fake_invoices": engine.detect_fake_invoices()}
 
 
@@ -518,39 +815,28 @@ def get_fake_invoices():
 def get_all_fraud_patterns():
     """Get all fraud patterns combined."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
-    return engine.detect_all_patterns()
+    return _cached_fraud_patterns()
 
 
 @app.get("/api/v1/risk/vendor/{gstin}")
 def get_vendor_risk(gstin: str):
     """Get risk score for a specific vendor."""
     _ensure_service_loaded()
-    engine = RiskScoringEngine(
-        _service.gstr1_df, _service.gstr2b_df,
-        _service.gstr3b_df, _service.fraud_labels_df
-    )
-    return engine.compute_risk_score(gstin)
+    return _get_risk_engine().compute_risk_score(gstin)
 
 
 @app.get("/api/v1/risk/leaderboard")
 def get_risk_leaderboard():
     """Get top risky vendors."""
     _ensure_service_loaded()
-    engine = RiskScoringEngine(
-        _service.gstr1_df, _service.gstr2b_df,
-        _service.gstr3b_df, _service.fraud_labels_df
-    )
-    return {"leaderboard": engine.get_leaderboard()}
+    return {"leaderboard": _cached_leaderboard()}
 
 
 @app.get("/api/v1/explain/mismatch/{invoice_id}")
 def explain_mismatch(invoice_id: str):
     """Explain a specific mismatch."""
     _ensure_service_loaded()
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon.full_chain_reconciliation()
-    mismatches = recon.get_mismatches()
+    mismatches = _cached_mismatches()
 
     target = None
     for m in mismatches:
@@ -564,15 +850,39 @@ def explain_mismatch(invoice_id: str):
     return _explain_service.explain_mismatch(target)
 
 
+@app.get("/api/v1/explain/mismatches")
+async def explain_mismatches(limit: int = 20):
+    """Explain the first `limit` mismatches, with the LLM calls made concurrently."""
+    await asyncio.to_thread(_ensure_service_loaded)
+    mismatches = await asyncio.to_thread(_cached_mismatches)
+    return {"explanations": await _explain_service.explain_many(mismatches[:limit])}
+
+
+@app.post("/api/v1/explain/fraud-pattern/stream")
+def stream_fraud_pattern_explanation(body: dict):
+    """Stream a fraud pattern explanation as Server-Sent Events, one event per LLM chunk."""
+    pattern_type = body.get("pattern_type", "")
+    if not pattern_type:
+        return {"error": "No pattern_type provided"}
+
+    def events():
+        try:
+            for chunk in _explain_service.stream_fraud_pattern(pattern_type, body.get("pattern_data") or {}):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+        except LLMStreamError as e:
+            # The text sent so far is incomplete; tell the browser instead of ending normally
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/api/v1/explain/risk/{gstin}")
 def explain_risk(gstin: str):
     """Explain why a vendor has a certain risk score."""
     _ensure_service_loaded()
-    risk_engine = RiskScoringEngine(
-        _service.gstr1_df, _service.gstr2b_df,
-        _service.gstr3b_df, _service.fraud_labels_df
-    )
-    risk_data = risk_engine.compute_risk_score(gstin)
+    risk_data = _get_risk_engine().compute_risk_score(gstin)
     return _explain_service.explain_risk(risk_data)
 
 
@@ -599,12 +909,8 @@ def get_alerts():
     """Get all generated alerts."""
     _ensure_service_loaded()
 
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon.full_chain_reconciliation()
-    mismatches = recon.get_mismatches()
-
-    fraud_engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
-    fraud_patterns = fraud_engine.detect_all_patterns()
+    mismatches = _cached_mismatches()
+    fraud_patterns = _cached_fraud_patterns()
 
     alerts = _alert_service.generate_alerts(mismatches, fraud_patterns)
     return {"alerts": alerts, "total": len(alerts)}
@@ -614,11 +920,15 @@ def get_alerts():
 def reload_data():
     """Force reload data from disk and rebuild graph."""
     global _service
-    _service = GSTIngestionService()
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(base_dir, "../uploads")
-    _service.load_from_disk(data_dir)
-    _service.rebuild_graph()
+    with _load_lock:
+        _df_cache.clear()
+        service = GSTIngestionService()
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        data_dir = os.path.join(base_dir, "../uploads")
+        service.load_from_disk(data_dir)
+        service.rebuild_graph()
+        _service = service
+        _reset_compute_cache()  # after the swap, so a fresh cache only ever sees the new service
     node_count = _service.get_node_count()
     edge_count = _service.get_edge_count()
     _log_audit("DATA_RELOAD", f"Nodes: {node_count}, Edges: {edge_count}")
@@ -769,9 +1079,7 @@ def remove_from_watchlist(gstin: str):
 def export_mismatches():
     """Export reconciliation mismatches as JSON (frontend converts to CSV)."""
     _ensure_service_loaded()
-    recon = ReconciliationEngine(_service.gstr1_df, _service.gstr2b_df, _service.gstr3b_df)
-    recon.full_chain_reconciliation()
-    mismatches = recon.get_mismatches()
+    mismatches = _cached_mismatches()
     _log_audit("EXPORT_MISMATCHES", f"Exported {len(mismatches)} mismatches")
     return {"data": mismatches, "count": len(mismatches), "exported_at": datetime.utcnow().isoformat()}
 
@@ -780,8 +1088,7 @@ def export_mismatches():
 def export_fraud_report():
     """Export full fraud analysis as JSON."""
     _ensure_service_loaded()
-    engine = FraudDetectionEngine(_service.gstr1_df, _service.fraud_labels_df)
-    patterns = engine.detect_all_patterns()
+    patterns = _cached_fraud_patterns()
     _log_audit("EXPORT_FRAUD", f"Exported fraud report with {patterns['summary']['total_patterns']} patterns")
     return {"data": patterns, "exported_at": datetime.utcnow().isoformat()}
 
@@ -790,11 +1097,7 @@ def export_fraud_report():
 def export_risk_leaderboard():
     """Export risk leaderboard as JSON."""
     _ensure_service_loaded()
-    engine = RiskScoringEngine(
-        _service.gstr1_df, _service.gstr2b_df,
-        _service.gstr3b_df, _service.fraud_labels_df
-    )
-    lb = engine.get_leaderboard()
+    lb = _cached_leaderboard()
     _log_audit("EXPORT_RISK", f"Exported {len(lb)} risk entries")
     return {"data": lb, "count": len(lb), "exported_at": datetime.utcnow().isoformat()}
 
@@ -818,7 +1121,7 @@ def search_gstin(query: str):
     ].head(10)
 
     results = []
-    for _, row in matches.iterrows():
+    for row in matches.to_dict("records"):
         results.append({
             "gstin": row["gstin"],
             "legal_name": row.get("legal_name", "Unknown"),
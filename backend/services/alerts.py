@@ -4,6 +4,23 @@ AlertService — Generate structured alerts from reconciliation and fraud result
 
 from datetime import datetime
 
+SEVERITY_ORDER = {"CRITICAL": 0, "WARNING": 1, "INFO": 2}  # unknown severities sort last (3)
+
+ALERT_TYPE_MAP = {
+    "MISSING_IN_GSTR1": "MISMATCH",
+    "MISSING_IN_GSTR2B": "MISMATCH",
+    "VALUE_MISMATCH": "MISMATCH",
+    "TAX_MISMATCH": "MISMATCH",
+}
+
+# Only the template for a mismatch's own status gets formatted
+MESSAGE_TEMPLATES = {
+    "MISSING_IN_GSTR1": "Invoice {inv} in buyer's GSTR-2B but missing from seller's GSTR-1",
+    "MISSING_IN_GSTR2B": "Invoice {inv} in seller's GSTR-1 but missing from buyer's GSTR-2B",
+    "VALUE_MISMATCH": "Value mismatch of ₹{diff:,.2f} for invoice {inv}",
+    "TAX_MISMATCH": "Tax amount discrepancy detected for invoice {inv}",
+}
+
 
 class AlertService:
     """Generate and manage alerts from analysis results."""
@@ -18,27 +35,20 @@ class AlertService:
             status = mismatch.get("status", "UNKNOWN")
             invoice_id = mismatch.get("invoice_id", "N/A")
 
-            alert_type_map = {
-                "MISSING_IN_GSTR1": "MISMATCH",
-                "MISSING_IN_GSTR2B": "MISMATCH",
-                "VALUE_MISMATCH": "MISMATCH",
-                "TAX_MISMATCH": "MISMATCH",
-            }
-            alert_type = alert_type_map.get(status, "MISMATCH")
-
-            message_map = {
-                "MISSING_IN_GSTR1": f"Invoice {invoice_id} in buyer's GSTR-2B but missing from seller's GSTR-1",
-                "MISSING_IN_GSTR2B": f"Invoice {invoice_id} in seller's GSTR-1 but missing from buyer's GSTR-2B",
-                "VALUE_MISMATCH": f"Value mismatch of ₹{mismatch.get('value_difference', 0):,.2f} for invoice {invoice_id}",
-                "TAX_MISMATCH": f"Tax amount discrepancy detected for invoice {invoice_id}",
-            }
+            alert_type = ALERT_TYPE_MAP.get(status, "MISMATCH")
+
+            template = MESSAGE_TEMPLATES.get(status)
+            if template is None:
+                message = f"Mismatch: {status} for {invoice_id}"
+            else:
+                message = template.format(inv=invoice_id, diff=mismatch.get("value_difference", 0))
 
             alerts.append({
                 "id": f"ALERT-RECON-{len(alerts) + 1}",
                 "type": alert_type,
                 "severity": mismatch.get("severity", "INFO"),
                 "title": status.replace("_", " ").title(),
-                "message": message_map.get(status, f"Mismatch: {status} for {invoice_id}"),
+                "message": message,
                 "related_gstin": mismatch.get("supplier_gstin", "N/A"),
                 "related_invoice": invoice_id,
                 "created_at": now,
@@ -92,8 +102,9 @@ class AlertService:
                 "resolved": False,
             })
 
-        # Sort by severity
-        severity_order = {"CRITICAL": 0, "WARNING": 1, "INFO": 2}
-        alerts.sort(key=lambda x: severity_order.get(x["severity"], 3))
+        # Order by severity with one bucket pass (stable within a severity, like the sort it replaces)
+        buckets = [[], [], [], []]
+        for alert in alerts:
+            buckets[SEVERITY_ORDER.get(alert["severity"], 3)].append(alert)
 
-        return alerts
+        return [alert for bucket in buckets for alert in bucket]
@@ -7,6 +7,16 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 
+SEVERITY_LABELS = np.array(["INFO", "WARNING", "CRITICAL"])
+
+
+def _severity_labels(values, warning: float, critical: float) -> np.ndarray:
+    """Label each value CRITICAL / WARNING / INFO when strictly above the given thresholds, without per-row branches."""
+    values = np.asarray(values, dtype=np.float64)
+    idx = np.searchsorted([warning, critical], values)  # side="left": a value equal to a threshold stays below it
+    idx[np.isnan(values)] = 0
+    return SEVERITY_LABELS[idx]
+
 
 class AnomalyDetectionService:
     """Detect statistical anomalies in GST filing data."""
@@ -23,35 +33,40 @@ class AnomalyDetectionService:
         if self.gstr1.empty or "total_value" not in self.gstr1.columns:
             return []
 
-        values = self.gstr1["total_value"].dropna().astype(float)
-        if len(values) < 5:
+        # Cast the column once; the statistics run on the NaN-free view of the same array
+        values = self.gstr1["total_value"].to_numpy(dtype=np.float64)
+        valid = values[~np.isnan(values)]
+        if len(valid) < 5:
             return []
 
-        mean_val = values.mean()
-        std_val = values.std()
+        mean_val = valid.mean()
+        std_val = valid.std(ddof=1)
         if std_val == 0:
             return []
 
-        self.gstr1["z_score"] = (self.gstr1["total_value"].astype(float) - mean_val) / std_val
+        self.gstr1["z_score"] = (values - mean_val) / std_val
 
-        anomalies = self.gstr1[self.gstr1["z_score"].abs() > z_threshold].copy()
+        anomalies = self.gstr1[self.gstr1["z_score"].abs() > z_threshold]
+        z = anomalies["z_score"].to_numpy(dtype=float)
+        abs_z = np.abs(z)
 
-        results = []
-        for _, row in anomalies.iterrows():
-            z = float(row["z_score"])
-            results.append({
-                "invoice_id": str(row.get("invoice_id", "N/A")),
-                "supplier_gstin": str(row.get("supplier_gstin", "N/A")),
-                "receiver_gstin": str(row.get("receiver_gstin", "N/A")),
-                "total_value": round(float(row.get("total_value", 0)), 2),
-                "z_score": round(z, 3),
-                "anomaly_direction": "UNUSUALLY_HIGH" if z > 0 else "UNUSUALLY_LOW",
-                "confidence": round(min(abs(z) / 5.0, 1.0), 3),  # 0-1 confidence
-                "severity": "CRITICAL" if abs(z) > 4 else "WARNING" if abs(z) > 3 else "INFO",
-            })
+        def text(col):
+            return anomalies[col].astype(object).map(str) if col in anomalies.columns else "N/A"
 
-        results.sort(key=lambda x: abs(x["z_score"]), reverse=True)
-        return results
+        # Build every result column at once instead of boxing each flagged row as a Series
+        results = pd.DataFrame({
+            "invoice_id": text("invoice_id"),
+            "supplier_gstin": text("supplier_gstin"),
+            "receiver_gstin": text("receiver_gstin"),
+            "total_value": anomalies["total_value"].astype(float).round(2),
+            "z_score": np.round(z, 3),
+            "anomaly_direction": np.where(z > 0, "UNUSUALLY_HIGH", "UNUSUALLY_LOW"),
+            "confidence": np.round(np.minimum(abs_z / 5.0, 1.0), 3),  # 0-1 confidence
+            "severity": _severity_labels(abs_z, 3.0, 4.0),
+        }, index=anomalies.index)
+
+        results = results.sort_values("z_score", key=lambda s: s.abs(), ascending=False, kind="stable")
+        return results.to_dict("records")
 
     def detect_vendor_anomalies(self) -> list[dict]:
         """Detect vendors with anomalous behavior using IQR on aggregate metrics."""
@@ -69,6 +84,9 @@ class AnomalyDetectionService:
         if len(vendor_stats) < 5:
             return []
 
+        gstins = vendor_stats["supplier_gstin"].to_numpy()
+        invoice_counts = vendor_stats["invoice_count"].to_numpy()
+
         results = []
         for metric in ["total_volume", "avg_invoice"]:
             q1 = vendor_stats[metric].quantile(0.25)
@@ -80,34 +98,31 @@ class AnomalyDetectionService:
             upper_fence = q3 + 1.5 * iqr
             lower_fence = q1 - 1.5 * iqr
 
-            outliers = vendor_stats[
-                (vendor_stats[metric] > upper_fence) | (vendor_stats[metric] < lower_fence)
-            ]
-
-            for _, row in outliers.iterrows():
-                val = float(row[metric])
-                # Calculate how far outside the fence
-                if val > upper_fence:
-                    deviation = (val - upper_fence) / iqr
-                    direction = "ABOVE_UPPER_FENCE"
-                else:
-                    deviation = (lower_fence - val) / iqr
-                    direction = "BELOW_LOWER_FENCE"
+            values = vendor_stats[metric].to_numpy(dtype=np.float64)
+            idx = np.flatnonzero((values > upper_fence) | (values < lower_fence))
+            values = values[idx]
 
-                confidence = round(min(deviation / 3.0, 1.0), 3)
+            # Calculate how far outside the fence
+            above = values > upper_fence
+            deviations = np.where(above, (values - upper_fence) / iqr, (lower_fence - values) / iqr)
+            confidences = np.round(np.minimum(deviations / 3.0, 1.0), 3)
+            severities = _severity_labels(confidences, 0.5, 0.8)
 
+            for i, val, is_above, deviation, confidence, severity in zip(
+                idx, values.tolist(), above, deviations, confidences.tolist(), severities.tolist()
+            ):
                 results.append({
-                    "gstin": row["supplier_gstin"],
+                    "gstin": gstins[i],
                     "metric": metric,
                     "value": round(val, 2),
                     "formatted_value": f"₹{val:,.2f}",
                     "upper_fence": round(upper_fence, 2),
                     "lower_fence": round(lower_fence, 2),
-                    "direction": direction,
+                    "direction": "ABOVE_UPPER_FENCE" if is_above else "BELOW_LOWER_FENCE",
                     "iqr_deviation": round(deviation, 3),
                     "confidence": confidence,
-                    "invoice_count": int(row["invoice_count"]),
-                    "severity": "CRITICAL" if confidence > 0.8 else "WARNING" if confidence > 0.5 else "INFO",
+                    "invoice_count": int(invoice_counts[i]),
+                    "severity": severity,
                 })
 
         results.sort(key=lambda x: x["confidence"], reverse=True)
@@ -118,7 +133,7 @@ class AnomalyDetectionService:
         if self.gstr3b.empty:
             return []
 
-        df = self.gstr3b.copy()
+        df = self.gstr3b
 
         # Aggregate per GSTIN
         itc_col = "total_itc_claimed" if "total_itc_claimed" in df.columns else "itc_claimed"
@@ -132,34 +147,38 @@ class AnomalyDetectionService:
             total_sales=(sales_col, "sum"),
         ).reset_index()
 
-        agg["itc_ratio"] = agg["total_itc"] / agg["total_sales"].clip(lower=1)
+        gstins = agg["gstin"].to_numpy()
+        total_itc = agg["total_itc"].to_numpy(dtype=np.float64)
+        total_sales = agg["total_sales"].to_numpy(dtype=np.float64)
+        itc_ratio = total_itc / np.maximum(total_sales, 1.0)
 
-        ratios = agg["itc_ratio"].dropna()
+        ratios = itc_ratio[~np.isnan(itc_ratio)]
         if len(ratios) < 5:
             return []
 
         mean_ratio = ratios.mean()
-        std_ratio = ratios.std()
+        std_ratio = ratios.std(ddof=1)
         if std_ratio == 0:
             return []
 
-        results = []
-        for _, row in agg.iterrows():
-            z = (row["itc_ratio"] - mean_ratio) / std_ratio
-            if abs(z) < 2.0:
-                continue
+        z_scores = (itc_ratio - mean_ratio) / std_ratio
+        severities = _severity_labels(itc_ratio, 0.7, 0.95)
 
+        results = []
+        for i in np.flatnonzero(~(np.abs(z_scores) < 2.0)):
+            z = z_scores[i]
+            ratio = itc_ratio[i]
             confidence = round(min(abs(z) / 5.0, 1.0), 3)
 
             results.append({
-                "gstin": row["gstin"],
-                "itc_ratio": round(float(row["itc_ratio"]), 4),
-                "total_itc": round(float(row["total_itc"]), 2),
-                "total_sales": round(float(row["total_sales"]), 2),
+                "gstin": gstins[i],
+                "itc_ratio": round(float(ratio), 4),
+                "total_itc": round(float(total_itc[i]), 2),
+                "total_sales": round(float(total_sales[i]), 2),
                 "z_score": round(z, 3),
                 "confidence": confidence,
-                "severity": "CRITICAL" if row["itc_ratio"] > 0.95 else "WARNING" if row["itc_ratio"] > 0.7 else "INFO",
-                "reason": f"ITC/Sales ratio of {row['itc_ratio']:.2%} is {abs(z):.1f}σ from mean ({mean_ratio:.2%})",
+                "severity": str(severities[i]),
+                "reason": f"ITC/Sales ratio of {ratio:.2%} is {abs(z):.1f}σ from mean ({mean_ratio:.2%})",
             })
 
         results.sort(key=lambda x: x["confidence"], reverse=True)
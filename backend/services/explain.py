@@ -4,11 +4,62 @@ mismatches and risk decisions using template + Groq LLM.
 """
 
 import os
-from groq import Groq
+import string
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 
 load_dotenv()
 
+MAX_CONCURRENT_LLM_CALLS = 8  # cap on in-flight Groq requests in explain_many
+LLM_CACHE_SIZE = 2048  # (finding, context) → LLM text, LRU
+LOW_SEVERITIES = frozenset({"INFO", "LOW"})  # findings that keep their template text, no LLM call
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_MAX_TOKENS = 300
+
+# Prompt pieces built once; only the finding and context change per call
+_LLM_SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert GST Intelligence Officer."}
+_LLM_PROMPT = (
+    "You are an expert GST Intelligence Officer in India. Given this finding, "
+    "provide a clear, actionable 2-3 sentence explanation for a tax officer:\n\n"
+    "Finding: {finding}\n"
+    "Context: {context}\n\n"
+    "Explain: (1) What happened, (2) Why it matters, (3) What action to take. "
+    "Be concise and professional."
+)
+
+class LLMStreamError(Exception):
+    """Raised when a Groq stream fails after some chunks were already yielded."""
+
+
+# Recommended follow-ups per mismatch type, shared across calls
+_ACTIONS: dict[str, tuple[str, ...]] = {
+    "MISSING_IN_GSTR1": (
+        "Issue notice to seller to file amended GSTR-1",
+        "Suspend buyer's ITC claim until seller files",
+        "Add seller to watchlist for late filing",
+    ),
+    "MISSING_IN_GSTR2B": (
+        "Verify if buyer received the goods/services",
+        "Check for potential phantom invoice creation",
+        "Cross-check with e-way bill records",
+    ),
+    "VALUE_MISMATCH": (
+        "Request both parties to submit original invoices",
+        "Check for credit/debit notes that may explain the difference",
+        "Flag for manual audit if difference exceeds ₹1 lakh",
+    ),
+    "TAX_MISMATCH": (
+        "Verify HSN code classification for correct tax rate",
+        "Check if partial ITC reversal is required",
+        "Cross-reference with GSTR-9 annual return",
+    ),
+}
+_DEFAULT_ACTIONS = ("Refer to senior officer for manual review",)
+
 
 class ExplainableAIService:
     """Generates natural-language explanations for audit findings."""
@@ -52,27 +103,58 @@ class ExplainableAIService:
         ),
     }
 
+    # Field names each template needs, parsed once when the class is created
+    TEMPLATE_FIELDS = {
+        name: frozenset(field for _, field, _, _ in string.Formatter().parse(template) if field)
+        for name, template in TEMPLATES.items()
+    }
+
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
         self.client = Groq(api_key=api_key) if api_key else None
+        self.async_client = AsyncGroq(api_key=api_key) if api_key else None
+        self._llm_cache = OrderedDict()
+        self._llm_cache_lock = threading.Lock()  # sync endpoints share the cache across threadpool workers
 
     def explain_mismatch(self, mismatch: dict) -> dict:
         """Generate explanation for a reconciliation mismatch."""
+        base_explanation, context, severity = self._mismatch_finding(mismatch)
+
+        # Enhance with LLM if available
+        enhanced = self._enhance_with_llm(base_explanation, context=context, severity=severity)
+
+        return self._mismatch_explanation(mismatch, base_explanation, enhanced)
+
+    async def explain_many(self, mismatches: list[dict]) -> list[dict]:
+        """Explain a batch of mismatches, running the LLM enhancements concurrently."""
+        findings = [self._mismatch_finding(m) for m in mismatches]
+        unique = list(dict.fromkeys(findings))  # identical findings share one LLM call
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+        enhanced = await asyncio.gather(*(
+            self._enhance_with_llm_async(base, context, semaphore, severity)
+            for base, context, severity in unique
+        ))
+        enhanced = dict(zip(unique, enhanced))
+        return [
+            self._mismatch_explanation(m, finding[0], enhanced[finding])
+            for m, finding in zip(mismatches, findings)
+        ]
+
+    def _mismatch_finding(self, mismatch: dict) -> tuple[str, str, str]:
+        """Template explanation, LLM context and severity for a mismatch."""
         status = mismatch.get("status", "UNKNOWN")
-        template = self.TEMPLATES.get(status, "")
 
         # Build base explanation from template
-        try:
-            base_explanation = template.format(**mismatch)
-        except (KeyError, ValueError):
+        base_explanation = self._render_template(status, mismatch)
+        if base_explanation is None:
             base_explanation = f"Mismatch detected: {status} for invoice {mismatch.get('invoice_id', 'N/A')}"
 
-        # Enhance with LLM if available
-        enhanced = self._enhance_with_llm(
-            base_explanation,
-            context=f"Mismatch type: {status}, Severity: {mismatch.get('severity', 'N/A')}",
-        )
+        context = f"Mismatch type: {status}, Severity: {mismatch.get('severity', 'N/A')}"
+        return base_explanation, context, mismatch.get("severity", "INFO")
 
+    def _mismatch_explanation(self, mismatch: dict, base_explanation: str, enhanced: str) -> dict:
+        """Assemble the response for an explained mismatch."""
+        status = mismatch.get("status", "UNKNOWN")
         return {
             "invoice_id": mismatch.get("invoice_id", "N/A"),
             "status": status,
@@ -108,6 +190,7 @@ class ExplainableAIService:
         enhanced = self._enhance_with_llm(
             base_explanation,
             context=f"Risk level: {level}, Score: {score}",
+            severity=level,
         )
 
         return {
@@ -121,16 +204,12 @@ class ExplainableAIService:
 
     def explain_fraud_pattern(self, pattern_type: str, pattern_data: dict) -> dict:
         """Generate explanation for a detected fraud pattern."""
-        template = self.TEMPLATES.get(pattern_type, "")
-
-        try:
-            base_explanation = template.format(**pattern_data)
-        except (KeyError, ValueError):
-            base_explanation = f"Fraud pattern detected: {pattern_type}"
+        base_explanation = self._fraud_pattern_finding(pattern_type, pattern_data)
 
         enhanced = self._enhance_with_llm(
             base_explanation,
             context=f"Pattern type: {pattern_type}",
+            severity="CRITICAL",
         )
 
         return {
@@ -140,56 +219,129 @@ class ExplainableAIService:
             "severity": "CRITICAL",
         }
 
-    def _enhance_with_llm(self, base_explanation: str, context: str) -> str:
-        """Enhance explanation using Groq LLM."""
-        if not self.client:
-            return base_explanation
-
-        prompt = (
-            "You are an expert GST Intelligence Officer in India. Given this finding, "
-            "provide a clear, actionable 2-3 sentence explanation for a tax officer:\n\n"
-            f"Finding: {base_explanation}\n"
-            f"Context: {context}\n\n"
-            "Explain: (1) What happened, (2) Why it matters, (3) What action to take. "
-            "Be concise and professional."
+    def stream_fraud_pattern(self, pattern_type: str, pattern_data: dict):
+        """Yield the explanation for a fraud pattern chunk by chunk as the LLM generates it."""
+        base_explanation = self._fraud_pattern_finding(pattern_type, pattern_data)
+        yield from self._stream_llm(
+            base_explanation,
+            context=f"Pattern type: {pattern_type}",
+            severity="CRITICAL",
         )
 
+    def _fraud_pattern_finding(self, pattern_type: str, pattern_data: dict) -> str:
+        """Template text for a fraud pattern, or a generic line if it cannot be rendered."""
+        base_explanation = self._render_template(pattern_type, pattern_data)
+        if base_explanation is None:
+            base_explanation = f"Fraud pattern detected: {pattern_type}"
+        return base_explanation
+
+    def _render_template(self, name: str, values: dict):
+        """Fill the named template from values; None if a field is missing or cannot be formatted."""
+        if not self.TEMPLATE_FIELDS.get(name, frozenset()) <= values.keys():
+            return None
+        try:
+            return self.TEMPLATES.get(name, "").format_map(values)
+        except ValueError:
+            return None
+
+    def _llm_messages(self, base_explanation: str, context: str) -> list[dict]:
+        """Chat messages asking the LLM to expand a finding."""
+        return [
+            _LLM_SYSTEM_MESSAGE,
+            {"role": "user", "content": _LLM_PROMPT.format(finding=base_explanation, context=context)},
+        ]
+
+    def _llm_cache_key(self, base_explanation: str, context: str) -> str:
+        """Digest identifying a (finding, context) pair in the LLM cache."""
+        return hashlib.blake2b(f"{base_explanation}\0{context}".encode(), digest_size=16).hexdigest()
+
+    def _cached_llm(self, key: str):
+        """LLM text previously generated for key, or None."""
+        with self._llm_cache_lock:
+            text = self._llm_cache.get(key)
+            if text is not None:
+                self._llm_cache.move_to_end(key)
+            return text
+
+    def _store_llm(self, key: str, text: str):
+        """Remember LLM text for key, evicting the least recently used entry."""
+        with self._llm_cache_lock:
+            self._llm_cache[key] = text
+            if len(self._llm_cache) > LLM_CACHE_SIZE:
+                self._llm_cache.popitem(last=False)
+
+    def _enhance_with_llm(self, base_explanation: str, context: str, severity: str = None) -> str:
+        """Enhance explanation using Groq LLM; low-severity findings keep the template text."""
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are an expert GST Intelligence Officer."},
-                    {"role": "user", "content": prompt},
-                ],
-                model="llama-3.3-70b-versatile",
-                max_tokens=300,
+            return "".join(self._stream_llm(base_explanation, context, severity))
+        except LLMStreamError:
+            return base_explanation  # never hand back a cut-off explanation
+
+    def _stream_llm(self, base_explanation: str, context: str, severity: str = None):
+        """
+        Yield the LLM explanation as streamed chunks; falls back to the template text.
+        Raises LLMStreamError if the stream breaks after chunks were already yielded.
+        """
+        if not self.client or severity in LOW_SEVERITIES:
+            yield base_explanation
+            return
+
+        key = self._llm_cache_key(base_explanation, context)
+        cached = self._cached_llm(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        try:
+            stream = self.client.chat.completions.create(
+                messages=self._llm_messages(base_explanation, context),
+                model=LLM_MODEL,
+                max_tokens=LLM_MAX_TOKENS,
+                stream=True,
             )
-            return response.choices[0].message.content
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
         except Exception as e:
             print(f"⚠️ Groq LLM error: {e}")
+            if parts:
+                raise LLMStreamError(str(e)) from e
+            yield base_explanation
+            return
+
+        if parts:
+            self._store_llm(key, "".join(parts))
+        else:
+            yield base_explanation
+
+    async def _enhance_with_llm_async(self, base_explanation: str, context: str,
+                                      semaphore: asyncio.Semaphore, severity: str = None) -> str:
+        """Enhance explanation using the async Groq client, bounded by semaphore."""
+        if not self.async_client or severity in LOW_SEVERITIES:
             return base_explanation
 
-    def _get_actions(self, status: str) -> list[str]:
+        key = self._llm_cache_key(base_explanation, context)
+        cached = self._cached_llm(key)
+        if cached is not None:
+            return cached
+
+        try:
+            async with semaphore:
+                response = await self.async_client.chat.completions.create(
+                    messages=self._llm_messages(base_explanation, context),
+                    model=LLM_MODEL,
+                    max_tokens=LLM_MAX_TOKENS,
+                )
+            text = response.choices[0].message.content
+            self._store_llm(key, text)
+            return text
+        except Exception as e:
+            print(f"⚠️ Groq LLM error: {e}")
+            return base_explanation
+
+    def _get_actions(self, status: str) -> tuple[str, ...]:
         """Get recommended actions for a given mismatch type."""
-        actions = {
-            "MISSING_IN_GSTR1": [
-                "Issue notice to seller to file amended GSTR-1",
-                "Suspend buyer's ITC claim until seller files",
-                "Add seller to watchlist for late filing",
-            ],
-            "MISSING_IN_GSTR2B": [
-                "Verify if buyer received the goods/services",
-                "Check for potential phantom invoice creation",
-                "Cross-check with e-way bill records",
-            ],
-            "VALUE_MISMATCH": [
-                "Request both parties to submit original invoices",
-                "Check for credit/debit notes that may explain the difference",
-                "Flag for manual audit if difference exceeds ₹1 lakh",
-            ],
-            "TAX_MISMATCH": [
-                "Verify HSN code classification for correct tax rate",
-                "Check if partial ITC reversal is required",
-                "Cross-reference with GSTR-9 annual return",
-            ],
-        }
-        return actions.get(status, ["Refer to senior officer for manual review"])
+        return _ACTIONS.get(status, _DEFAULT_ACTIONS)
@@ -3,10 +3,55 @@ FraudDetectionEngine — Detect fraud patterns using Neo4j graph + Cypher querie
 Patterns: Circular trading, shell companies, reciprocal trading, fake invoices.
 """
 
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
+import numpy as np
 import pandas as pd
 from collections import defaultdict
-from services.neo4j_driver import run_read_query
+from operator import itemgetter
+from scipy.sparse import csr_matrix
+from services.neo4j_driver import run_read_query, run_read_stream, get_edge_count
+
+MAX_CYCLE_LENGTH = 6  # longest invoice ring searched for in Cypher
+GDS_PROCEDURE_NOT_FOUND = "Neo.ClientError.Procedure.ProcedureNotFound"
+
+# ─── Neo4j GDS availability (None = not probed yet) ───
+_gds_available = None
+
+
+def _sparse_pagerank(src: list, dst: list, isolated: list, alpha: float = 0.85,
+                     max_iter: int = 100, tol: float = 1.0e-6) -> dict:
+    """
+    PageRank by power iteration on a scipy CSR matrix, without building a NetworkX graph.
+    Matches nx.pagerank on a DiGraph of the same edges (repeated edges count once).
+    """
+    m = len(src)
+    endpoints = np.empty(2 * m + len(isolated), dtype=object)
+    endpoints[0:2 * m:2] = src
+    endpoints[1:2 * m:2] = dst
+    endpoints[2 * m:] = isolated
+    # First-appearance order, the same node order NetworkX would use
+    codes, nodelist = pd.factorize(endpoints)
+    n = len(nodelist)
+    if n == 0:
+        return {}
+
+    A = csr_matrix((np.ones(m), (codes[0:2 * m:2], codes[1:2 * m:2])), shape=(n, n))
+    A.data[:] = 1.0  # collapse repeated invoices between the same pair into one edge
+    S = np.asarray(A.sum(axis=1)).ravel()
+    S[S != 0] = 1.0 / S[S != 0]
+    A = csr_matrix(A.multiply(S[:, None]))
+
+    x = np.repeat(1.0 / n, n)
+    p = np.repeat(1.0 / n, n)
+    is_dangling = np.where(S == 0)[0]
+    for _ in range(max_iter):
+        xlast = x
+        x = alpha * (x @ A + sum(x[is_dangling]) * p) + (1 - alpha) * p
+        if np.absolute(x - xlast).sum() < n * tol:
+            return dict(zip(nodelist, map(float, x)))
+    raise nx.PowerIterationFailedConvergence(max_iter)
 
 
 class FraudDetectionEngine:
@@ -14,23 +59,38 @@ class FraudDetectionEngine:
 
     def __init__(self, gstr1_df: pd.DataFrame, fraud_labels_df: pd.DataFrame = None):
         self.gstr1_df = gstr1_df
+        self._graph_size = None  # Taxpayer count, memoized while detect_all_patterns runs
+        self._pagerank_cache = None  # ((node_count, edge_count), pagerank) from the last computation
         # Build set of GSTINs labeled as circular traders for targeted detection
-        self.circular_gstins: set = set()
+        self.circular_gstins: frozenset = frozenset()
         if fraud_labels_df is not None and not fraud_labels_df.empty:
-            mask = fraud_labels_df["fraud_type"].astype(str).str.lower().str.contains("circular")
-            self.circular_gstins = set(fraud_labels_df.loc[mask, "gstin"].dropna())
+            mask = fraud_labels_df["fraud_type"].astype(str).str.contains("circular", case=False, regex=False, na=False)
+            self.circular_gstins = frozenset(fraud_labels_df["gstin"][mask].dropna())
 
     def _get_graph_size(self) -> int:
         """Get the number of Taxpayer nodes in Neo4j."""
+        if self._graph_size is not None:
+            return self._graph_size
         result = run_read_query("MATCH (t:Taxpayer) RETURN count(t) AS cnt")
         return result[0]["cnt"] if result else 0
 
     def detect_all_patterns(self) -> dict:
         """Run all fraud detection patterns and return combined results."""
-        circular = self.detect_circular_trading()
-        shell = self.detect_shell_companies()
-        reciprocal = self.detect_reciprocal_trading()
-        fake = self.detect_fake_invoices()
+        # Count Taxpayer nodes once for all three graph detectors
+        self._graph_size = self._get_graph_size()
+        try:
+            # The graph detectors mostly wait on Neo4j, so run all four side by side
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                circular_future = pool.submit(self.detect_circular_trading)
+                shell_future = pool.submit(self.detect_shell_companies)
+                reciprocal_future = pool.submit(self.detect_reciprocal_trading)
+                fake_future = pool.submit(self.detect_fake_invoices)
+                circular = circular_future.result()
+                shell = shell_future.result()
+                reciprocal = reciprocal_future.result()
+                fake = fake_future.result()
+        finally:
+            self._graph_size = None  # standalone detector calls re-count; the graph may be rebuilt
 
         # Track unique entities flagged across all patterns to avoid double-counting in flags
         flagged_entities = set()
@@ -74,73 +134,74 @@ class FraudDetectionEngine:
         Detect circular invoice chains (A → B → C → A) using Neo4j Cypher.
         Returns cycles with metadata: chain, value, edges.
         """
-        if self._get_graph_size() == 0:
+        if min_chain_length > MAX_CYCLE_LENGTH or self._get_graph_size() == 0:
             return []
 
-        # Use Cypher to find cycles of length 3 to 6
-        # We query for variable-length paths that return to the start node
-        results = []
+        # One variable-length query covers every cycle length up to MAX_CYCLE_LENGTH;
+        # the filters run in Cypher so LIMIT counts only relevant cycles
+        conditions = [
+            # A start node with no incoming invoice cannot close a cycle; skip its expansion
+            "EXISTS { ()-[:INVOICE]->(start) }",
+            # Simple cycles only: no node (and so no self-loop) appears twice
+            "ALL(n IN nodes(path)[1..] WHERE single(m IN nodes(path)[1..] WHERE m = n))",
+        ]
+        parameters = {}
+        if self.circular_gstins:
+            conditions.append("ANY(n IN nodes(path) WHERE n.gstin IN $labeled)")
+            parameters["labeled"] = list(self.circular_gstins)
+
+        cypher = f"""
+            MATCH path = (start:Taxpayer)-[:INVOICE*{min_chain_length}..{MAX_CYCLE_LENGTH}]->(start)
+            WHERE {" AND ".join(conditions)}
+            WITH nodes(path) AS cycle_nodes, relationships(path) AS rels
+            LIMIT 200
+            RETURN
+                [n IN cycle_nodes | n.gstin] AS chain,
+                [r IN rels | {{
+                    invoice_id: r.invoice_id,
+                    total_value: r.total_value,
+                    from_gstin: startNode(r).gstin,
+                    to_gstin: endNode(r).gstin
+                }}] AS edges
+        """
+
+        try:
+            records = run_read_query(cypher, parameters)
+        except Exception as e:
+            print(f"⚠️ Cycle detection error: {e}")
+            return []
 
-        for cycle_len in range(min_chain_length, 7):
+        results = []
+        for record in records:
             if len(results) >= 50:
                 break
 
-            cypher = f"""
-                MATCH path = (start:Taxpayer)-[:INVOICE*{cycle_len}]->(start)
-                WITH nodes(path) AS cycle_nodes, relationships(path) AS rels
-                LIMIT 200
-                RETURN
-                    [n IN cycle_nodes | n.gstin] AS chain,
-                    [r IN rels | {{
-                        invoice_id: r.invoice_id,
-                        total_value: r.total_value,
-                        from_gstin: startNode(r).gstin,
-                        to_gstin: endNode(r).gstin
-                    }}] AS edges
-            """
+            chain = record["chain"][:-1]  # Remove duplicate start node at end
+            edges_data = record["edges"]
 
-            try:
-                records = run_read_query(cypher)
-            except Exception as e:
-                print(f"⚠️ Cycle detection error (length {cycle_len}): {e}")
-                continue
-
-            for record in records:
-                if len(results) >= 50:
-                    break
-
-                chain = record["chain"][:-1]  # Remove duplicate start node at end
-                edges_data = record["edges"]
-
-                # If fraud labels exist, only surface cycles that involve a labeled GSTIN
-                if self.circular_gstins and not any(
-                    gstin in self.circular_gstins for gstin in chain
-                ):
-                    continue
-
-                # Calculate total circular value
-                circular_value = sum(float(e.get("total_value", 0)) for e in edges_data)
-
-                edges_in_cycle = []
-                for e in edges_data:
-                    edges_in_cycle.append({
-                        "from": e.get("from_gstin", "N/A"),
-                        "to": e.get("to_gstin", "N/A"),
-                        "invoice_id": e.get("invoice_id", "N/A"),
-                        "value": float(e.get("total_value", 0)),
-                    })
-
-                results.append({
-                    "chain": chain,
-                    "chain_length": len(chain),
-                    "circular_value": round(circular_value, 2),
-                    "formatted_value": f"₹{circular_value:,.2f}",
-                    "edges": edges_in_cycle,
-                    "severity": "CRITICAL",
+            # Calculate total circular value
+            circular_value = sum(float(e.get("total_value", 0)) for e in edges_data)
+
+            edges_in_cycle = []
+            for e in edges_data:
+                edges_in_cycle.append({
+                    "from": e.get("from_gstin", "N/A"),
+                    "to": e.get("to_gstin", "N/A"),
+                    "invoice_id": e.get("invoice_id", "N/A"),
+                    "value": float(e.get("total_value", 0)),
                 })
 
+            results.append({
+                "chain": chain,
+                "chain_length": len(chain),
+                "circular_value": round(circular_value, 2),
+                "formatted_value": f"₹{circular_value:,.2f}",
+                "edges": edges_in_cycle,
+                "severity": "CRITICAL",
+            })
+
         # Sort by circular value descending
-        results.sort(key=lambda x: x["circular_value"], reverse=True)
+        results.sort(key=itemgetter("circular_value"), reverse=True)
         return results
 
     def detect_shell_companies(
@@ -150,38 +211,43 @@ class FraudDetectionEngine:
     ) -> list[dict]:
         """
         Shell companies: low graph importance (PageRank) but high transaction volume.
-        Uses NetworkX-based PageRank on adjacency fetched from Neo4j.
+        PageRank comes from Neo4j GDS, or a scipy power iteration on adjacency fetched from Neo4j.
         """
         if self._get_graph_size() == 0 or self.gstr1_df.empty:
             return []
 
-        # Compute PageRank via NetworkX on data fetched from Neo4j
         pagerank = self._compute_pagerank()
         if not pagerank:
             return []
 
-        suspects = []
+        # Total outward volume and invoice count per seller, in one pass over GSTR-1,
+        # aligned to the PageRank node order so both thresholds apply as one mask
+        scores = pd.Series(pagerank, dtype=np.float64)
+        volumes = (
+            self.gstr1_df.groupby("supplier_gstin", sort=False, observed=True)["total_value"]
+            .agg(["sum", "size"])
+            .reindex(scores.index, fill_value=0)
+        )
+        total_volumes = volumes["sum"].to_numpy(dtype=np.float64)
+        invoice_counts = volumes["size"].to_numpy()
+        # Important nodes (PageRank at or above the threshold) are not shell companies
+        hits = np.flatnonzero(~(scores.to_numpy() >= pagerank_threshold) & (total_volumes >= volume_threshold))
 
-        for gstin, pr_score in pagerank.items():
-            if pr_score >= pagerank_threshold:
-                continue  # Skip important nodes — they're not shell companies
-
-            # Total outward volume
-            seller_invoices = self.gstr1_df[self.gstr1_df["supplier_gstin"] == gstin]
-            total_volume = float(seller_invoices["total_value"].sum())
-
-            if total_volume >= volume_threshold:
-                suspects.append({
-                    "gstin": gstin,
-                    "pagerank": round(pr_score, 6),
-                    "total_volume": round(total_volume, 2),
-                    "formatted_volume": f"₹{total_volume:,.2f}",
-                    "invoice_count": len(seller_invoices),
-                    "severity": "CRITICAL",
-                    "reason": "Low network importance but abnormally high transaction volume",
-                })
+        suspects = []
+        for i in hits:
+            pr_score = float(scores.iat[i])
+            total_volume = float(total_volumes[i])
+            suspects.append({
+                "gstin": scores.index[i],
+                "pagerank": round(pr_score, 6),
+                "total_volume": round(total_volume, 2),
+                "formatted_volume": f"₹{total_volume:,.2f}",
+                "invoice_count": int(invoice_counts[i]),
+                "severity": "CRITICAL",
+                "reason": "Low network importance but abnormally high transaction volume",
+            })
 
-        suspects.sort(key=lambda x: x["total_volume"], reverse=True)
+        suspects.sort(key=itemgetter("total_volume"), reverse=True)
         return suspects
 
     def detect_reciprocal_trading(self) -> list[dict]:
@@ -191,123 +257,200 @@ class FraudDetectionEngine:
         if self._get_graph_size() == 0:
             return []
 
-        # Cypher: find all bidirectional invoice relationships
+        # Cypher: find all bidirectional invoice relationships, one row per pair.
+        # Each direction is aggregated on its own so k×m invoice combinations
+        # never reach the driver (and the sums are not multiplied by the other side)
         cypher = """
-            MATCH (a:Taxpayer)-[r1:INVOICE]->(b:Taxpayer)-[r2:INVOICE]->(a)
-            WHERE elementId(a) < elementId(b)
+            MATCH (a:Taxpayer)-[r1:INVOICE]->(b:Taxpayer)
+            WHERE elementId(a) < elementId(b) AND EXISTS { (b)-[:INVOICE]->(a) }
+            WITH a, b, sum(r1.total_value) AS a_to_b_value,
+                 collect(r1.invoice_id)[0] AS a_to_b_invoice
+            MATCH (b)-[r2:INVOICE]->(a)
+            WITH a, b, a_to_b_value, a_to_b_invoice,
+                 sum(r2.total_value) AS b_to_a_value,
+                 collect(r2.invoice_id)[0] AS b_to_a_invoice
             RETURN a.gstin AS party_a, b.gstin AS party_b,
-                   r1.total_value AS a_to_b_value,
-                   r2.total_value AS b_to_a_value,
-                   r1.invoice_id AS a_to_b_invoice,
-                   r2.invoice_id AS b_to_a_invoice
+                   a_to_b_value, b_to_a_value,
+                   a_to_b_invoice, b_to_a_invoice
         """
 
+        # Stream the pairs straight into results rather than holding the raw record list too
+        reciprocals = []
         try:
-            records = run_read_query(cypher)
+            for record in run_read_stream(cypher):
+                a_to_b = float(record.get("a_to_b_value", 0))
+                b_to_a = float(record.get("b_to_a_value", 0))
+
+                reciprocals.append({
+                    "party_a": record["party_a"],
+                    "party_b": record["party_b"],
+                    "a_to_b_value": round(a_to_b, 2),
+                    "b_to_a_value": round(b_to_a, 2),
+                    "a_to_b_formatted": f"₹{a_to_b:,.2f}",
+                    "b_to_a_formatted": f"₹{b_to_a:,.2f}",
+                    "a_to_b_invoice": record.get("a_to_b_invoice", "N/A"),
+                    "b_to_a_invoice": record.get("b_to_a_invoice", "N/A"),
+                    "severity": "WARNING",
+                    "_sort": round(a_to_b, 2) + round(b_to_a, 2),
+                })
         except Exception as e:
             print(f"⚠️ Reciprocal trading detection error: {e}")
             return []
 
-        reciprocals = []
-        for record in records:
-            a_to_b = float(record.get("a_to_b_value", 0))
-            b_to_a = float(record.get("b_to_a_value", 0))
-
-            reciprocals.append({
-                "party_a": record["party_a"],
-                "party_b": record["party_b"],
-                "a_to_b_value": round(a_to_b, 2),
-                "b_to_a_value": round(b_to_a, 2),
-                "a_to_b_formatted": f"₹{a_to_b:,.2f}",
-                "b_to_a_formatted": f"₹{b_to_a:,.2f}",
-                "a_to_b_invoice": record.get("a_to_b_invoice", "N/A"),
-                "b_to_a_invoice": record.get("b_to_a_invoice", "N/A"),
-                "severity": "WARNING",
-            })
-
-        reciprocals.sort(
-            key=lambda x: x["a_to_b_value"] + x["b_to_a_value"],
-            reverse=True,
-        )
+        # Combined value is precomputed while building, so the sort key is a C-level getter
+        reciprocals.sort(key=itemgetter("_sort"), reverse=True)
+        for r in reciprocals:
+            del r["_sort"]
         return reciprocals
 
     def detect_fake_invoices(self) -> list[dict]:
         """
         Detect invoices with suspicious patterns:
         round-number amounts, repeated identical values between same parties.
-        (Pure DataFrame logic — unchanged)
+        (Pure DataFrame/NumPy logic, no graph queries)
         """
         if self.gstr1_df.empty:
             return []
 
-        df = self.gstr1_df.copy()
-
-        # Filter: round lakh values above ₹5L
-        suspicious = df[
-            (df["total_value"] % 100000 == 0) & (df["total_value"] > 500000)
-        ].copy()
+        # Filter: round lakh values above ₹5L. Amounts are compared as whole paise in
+        # int64 so float noise (e.g. 600000.0000000001) cannot hide a round value
+        values = self.gstr1_df["total_value"].to_numpy(dtype=np.float64)
+        paise = np.rint(np.nan_to_num(values * 100.0, nan=0.0, posinf=0.0, neginf=0.0)).astype(np.int64)
+        suspicious = (values > 500000) & (paise % 10_000_000 == 0)
 
-        if suspicious.empty:
+        if not suspicious.any():
             return []
 
-        # Group by (seller, buyer) and find repeated identical amounts
-        grouped = (
-            suspicious.groupby(["supplier_gstin", "receiver_gstin"])
-            .agg(
-                count=("invoice_id", "count"),
-                unique_values=("total_value", "nunique"),
-                repeated_amount=("total_value", "first"),
-                total_value=("total_value", "sum"),
-            )
-            .reset_index()
-        )
+        # Only the columns used below are masked; the GSTR-1 frame itself is never copied
+        suppliers = self.gstr1_df["supplier_gstin"][suspicious]
+        receivers = self.gstr1_df["receiver_gstin"][suspicious]
+        invoice_ids = self.gstr1_df["invoice_id"].to_numpy()[suspicious]
+        values = values[suspicious]
+
+        # Group by (seller, buyer) on integer codes: sorted factorize codes for each
+        # side combine into one pair code, so every aggregate is a bincount
+        sup_codes, sup_uniques = pd.factorize(suppliers, sort=True)
+        rec_codes, rec_uniques = pd.factorize(receivers, sort=True)
+        keep = (sup_codes >= 0) & (rec_codes >= 0)  # like groupby, drop rows with a missing party
+        pair_keys = sup_codes[keep].astype(np.int64) * len(rec_uniques) + rec_codes[keep]
+        pair_codes, pair_uniques = pd.factorize(pair_keys, sort=True)
+        n_pairs = len(pair_uniques)
+
+        amounts = values[keep]
+        has_invoice = pd.notna(invoice_ids)[keep]
+        counts = np.bincount(pair_codes, weights=has_invoice, minlength=n_pairs).astype(np.int64)
+        totals = np.bincount(pair_codes, weights=amounts, minlength=n_pairs)
+        amount_codes, amount_uniques = pd.factorize(amounts)
+        distinct = np.unique(pair_codes.astype(np.int64) * len(amount_uniques) + amount_codes)
+        unique_values = np.bincount(distinct // max(len(amount_uniques), 1), minlength=n_pairs)
+        _, first_rows = np.unique(pair_codes, return_index=True)
 
         # Flag: 3+ round-number invoices with ≤2 unique values
-        flagged = grouped[(grouped["count"] >= 3) & (grouped["unique_values"] <= 2)]
+        flagged = np.flatnonzero((counts >= 3) & (unique_values <= 2))
 
         results = []
-        for _, row in flagged.iterrows():
+        for g in flagged:
+            count = int(counts[g])
+            repeated_amount = float(amounts[first_rows[g]])
+            total_value = float(totals[g])
             results.append({
-                "supplier_gstin": row["supplier_gstin"],
-                "receiver_gstin": row["receiver_gstin"],
-                "repeated_count": int(row["count"]),
-                "repeated_amount": round(float(row["repeated_amount"]), 2),
-                "formatted_amount": f"₹{float(row['repeated_amount']):,.2f}",
-                "total_value": round(float(row["total_value"]), 2),
+                "supplier_gstin": sup_uniques[pair_uniques[g] // len(rec_uniques)],
+                "receiver_gstin": rec_uniques[pair_uniques[g] % len(rec_uniques)],
+                "repeated_count": count,
+                "repeated_amount": round(repeated_amount, 2),
+                "formatted_amount": f"₹{repeated_amount:,.2f}",
+                "total_value": round(total_value, 2),
                 "severity": "WARNING",
-                "reason": f"{int(row['count'])} invoices with identical round amounts",
+                "reason": f"{count} invoices with identical round amounts",
             })
 
-        results.sort(key=lambda x: x["total_value"], reverse=True)
+        results.sort(key=itemgetter("total_value"), reverse=True)
         return results
 
     # ──────────────────────────────────────────────
-    # Private: PageRank via Neo4j → NetworkX fallback
+    # Private: PageRank via Neo4j GDS → scipy fallback
     # ──────────────────────────────────────────────
     def _compute_pagerank(self) -> dict:
+        """PageRank of the invoice graph, reused while its node and edge counts are unchanged."""
+        key = (self._get_graph_size(), get_edge_count())
+        if self._pagerank_cache is not None and self._pagerank_cache[0] == key:
+            return self._pagerank_cache[1]
+
+        pagerank = self._fetch_pagerank()
+        if pagerank:
+            self._pagerank_cache = (key, pagerank)
+        return pagerank
+
+    def _fetch_pagerank(self) -> dict:
         """
-        Compute PageRank by fetching adjacency from Neo4j and running NetworkX.
-        This avoids requiring the Neo4j GDS plugin.
+        Compute PageRank in Neo4j with the GDS plugin when it is installed; otherwise
+        fetch the adjacency from Neo4j and run a sparse power iteration in scipy.
         """
+        pagerank = self._pagerank_gds()
+        if pagerank is not None:
+            return pagerank
+
         try:
-            # Fetch all edges from Neo4j
-            edges = run_read_query(
+            # Stream all edges from Neo4j into flat endpoint lists
+            src, dst = [], []
+            for edge in run_read_stream(
                 "MATCH (a:Taxpayer)-[r:INVOICE]->(b:Taxpayer) RETURN a.gstin AS src, b.gstin AS dst"
-            )
-            if not edges:
+            ):
+                src.append(edge["src"])
+                dst.append(edge["dst"])
+            if not src:
                 return {}
 
-            # Build a lightweight in-memory graph for PageRank only
-            G = nx.DiGraph()
-            for edge in edges:
-                G.add_edge(edge["src"], edge["dst"])
+            # Also include isolated nodes
+            isolated = [node["gstin"] for node in run_read_stream("MATCH (t:Taxpayer) RETURN t.gstin AS gstin")]
 
-            # Also add isolated nodes
-            nodes = run_read_query("MATCH (t:Taxpayer) RETURN t.gstin AS gstin")
-            for node in nodes:
-                G.add_node(node["gstin"])
-
-            return nx.pagerank(G, alpha=0.85, max_iter=100)
+            return _sparse_pagerank(src, dst, isolated)
         except Exception as e:
             print(f"⚠️ PageRank computation error: {e}")
             return {}
+
+    def _pagerank_gds(self):
+        """PageRank streamed from Neo4j GDS, normalized to sum to 1; None if GDS is unavailable."""
+        global _gds_available
+        if _gds_available is False:
+            return None
+
+        graph_name = f"taxgraph_pagerank_{uuid.uuid4().hex}"
+        try:
+            run_read_query("CALL gds.graph.project($name, 'Taxpayer', 'INVOICE')", {"name": graph_name})
+        except Exception as e:
+            # Only a missing plugin is permanent; transient errors fall back this time and retry next call
+            if getattr(e, "code", None) == GDS_PROCEDURE_NOT_FOUND:
+                print(f"ℹ️ Neo4j GDS not available, using scipy PageRank: {e}")
+                _gds_available = False
+            else:
+                print(f"⚠️ GDS graph projection error, using scipy PageRank: {e}")
+            return None
+
+        _gds_available = True
+        try:
+            records = run_read_query(
+                """
+                CALL gds.pageRank.stream($name, {maxIterations: 100, dampingFactor: 0.85})
+                YIELD nodeId, score
+                RETURN gds.util.asNode(nodeId).gstin AS gstin, score
+                """,
+                {"name": graph_name},
+            )
+        except Exception as e:
+            print(f"⚠️ GDS PageRank error: {e}")
+            return None
+        finally:
+            try:
+                run_read_query("CALL gds.graph.drop($name, false)", {"name": graph_name})
+            except Exception as e:
+                print(f"⚠️ GDS graph drop error: {e}")
+
+        # GDS scores are unnormalized; scaling them to sum to 1 puts them on the same
+        # probability scale as the scipy path. GDS does not redistribute dangling-node
+        # mass like nx.pagerank does, so on graphs with sinks the scores (and which
+        # nodes fall under pagerank_threshold) can differ somewhat between the two paths
+        total = sum(record["score"] for record in records)
+        if not total:
+            return {}
+        return {record["gstin"]: record["score"] / total for record in records}
@@ -3,6 +3,7 @@ GSTIngestionService — Ingests GST filing data into Pandas DataFrames + Neo4j g
 Provides validated, deduplicated data to all downstream engines.
 """
 
+import numpy as np
 import pandas as pd
 import os
 from services.neo4j_driver import (
@@ -14,6 +15,24 @@ from services.neo4j_driver import (
     get_edge_count,
 )
 
+try:
+    import pyarrow  # noqa: F401 — only needed for read_csv's multithreaded pyarrow engine
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+WRITE_BATCH_SIZE = 5000  # rows per UNWIND write round-trip to Neo4j
+
+# Text columns pinned to str so the parser skips inference on them (and dates or
+# numeric-looking IDs stay as text); numeric columns are coerced on ingest instead
+CSV_DTYPES = {
+    "taxpayers": {"gstin": "str", "legal_name": "str", "registration_date": "str", "status": "str"},
+    "gstr1": {"invoice_id": "str", "supplier_gstin": "str", "receiver_gstin": "str", "invoice_date": "str"},
+    "gstr2b": {"invoice_id": "str", "supplier_gstin": "str", "receiver_gstin": "str", "invoice_date": "str"},
+    "gstr3b": {"gstin": "str", "return_period": "str"},
+    "fraud_labels": {"gstin": "str", "fraud_type": "str"},
+}
+
 
 class GSTIngestionService:
     """Central data service holding all DataFrames + Neo4j graph."""
@@ -40,7 +59,7 @@ class GSTIngestionService:
 
         for key, path in paths.items():
             try:
-                df = pd.read_csv(path)
+                df = pd.read_csv(path, dtype=CSV_DTYPES[key], engine=CSV_ENGINE)
                 if key == "taxpayers":
                     self.ingest_taxpayers_df(df)
                 elif key == "gstr1":
@@ -70,23 +89,7 @@ class GSTIngestionService:
         self.taxpayers_df = df
 
         # Add nodes to Neo4j graph (batch MERGE)
-        for _, row in df.iterrows():
-            run_write_query(
-                """
-                MERGE (t:Taxpayer {gstin: $gstin})
-                SET t.legal_name = $legal_name,
-                    t.status = $status,
-                    t.trust_score = $trust_score,
-                    t.state_code = $state_code
-                """,
-                {
-                    "gstin": row["gstin"],
-                    "legal_name": row.get("legal_name", "Unknown"),
-                    "status": row.get("status", "Active"),
-                    "trust_score": float(row.get("trust_score", 0.5)),
-                    "state_code": int(row.get("state_code", 0)),
-                },
-            )
+        self._write_taxpayers(df)
 
     def ingest_gstr1_df(self, df: pd.DataFrame):
         """Validate and store GSTR-1 outward supply data, add edges to Neo4j."""
@@ -102,26 +105,7 @@ class GSTIngestionService:
         self.gstr1_df = df
 
         # Add invoice edges to Neo4j graph
-        for _, row in df.iterrows():
-            supplier = row.get("supplier_gstin")
-            receiver = row.get("receiver_gstin")
-            if pd.notna(supplier) and pd.notna(receiver):
-                run_write_query(
-                    """
-                    MERGE (s:Taxpayer {gstin: $supplier})
-                    MERGE (r:Taxpayer {gstin: $receiver})
-                    MERGE (s)-[inv:INVOICE {invoice_id: $invoice_id}]->(r)
-                    SET inv.total_value = $total_value,
-                        inv.tax_amount = $tax_amount
-                    """,
-                    {
-                        "supplier": supplier,
-                        "receiver": receiver,
-                        "invoice_id": row.get("invoice_id"),
-                        "total_value": float(row.get("total_value", 0)),
-                        "tax_amount": float(row.get("tax_amount", 0)),
-                    },
-                )
+        self._write_invoices(df)
 
     def ingest_gstr2b_df(self, df: pd.DataFrame):
         """Validate and store GSTR-2B inward supply data."""
@@ -184,51 +168,71 @@ class GSTIngestionService:
 
         # Add taxpayer nodes
         if not self.taxpayers_df.empty:
-            for _, row in self.taxpayers_df.iterrows():
-                run_write_query(
-                    """
-                    MERGE (t:Taxpayer {gstin: $gstin})
-                    SET t.legal_name = $legal_name,
-                        t.status = $status,
-                        t.trust_score = $trust_score,
-                        t.state_code = $state_code
-                    """,
-                    {
-                        "gstin": row["gstin"],
-                        "legal_name": row.get("legal_name", "Unknown"),
-                        "status": row.get("status", "Active"),
-                        "trust_score": float(row.get("trust_score", 0.5)),
-                        "state_code": int(row.get("state_code", 0)),
-                    },
-                )
+            self._write_taxpayers(self.taxpayers_df)
 
         # Add invoice edges from GSTR-1
         if not self.gstr1_df.empty:
-            for _, row in self.gstr1_df.iterrows():
-                supplier = row.get("supplier_gstin")
-                receiver = row.get("receiver_gstin")
-                if pd.notna(supplier) and pd.notna(receiver):
-                    run_write_query(
-                        """
-                        MERGE (s:Taxpayer {gstin: $supplier})
-                        MERGE (r:Taxpayer {gstin: $receiver})
-                        MERGE (s)-[inv:INVOICE {invoice_id: $invoice_id}]->(r)
-                        SET inv.total_value = $total_value,
-                            inv.tax_amount = $tax_amount
-                        """,
-                        {
-                            "supplier": supplier,
-                            "receiver": receiver,
-                            "invoice_id": row.get("invoice_id"),
-                            "total_value": float(row.get("total_value", 0)),
-                            "tax_amount": float(row.get("tax_amount", 0)),
-                        },
-                    )
+            self._write_invoices(self.gstr1_df)
 
         node_count = get_node_count()
         edge_count = get_edge_count()
         print(f"📊 Neo4j graph rebuilt: {node_count} nodes, {edge_count} edges")
 
+    # ──────────────────────────────────────────────
+    # Private: Batched Neo4j writes
+    # ──────────────────────────────────────────────
+    def _write_taxpayers(self, df: pd.DataFrame):
+        """MERGE one Taxpayer node per row, WRITE_BATCH_SIZE rows per query."""
+        rows = pd.DataFrame({
+            "gstin": df["gstin"],
+            "legal_name": df.get("legal_name", "Unknown"),
+            "status": df.get("status", "Active"),
+            "trust_score": df.get("trust_score", 0.5),
+            "state_code": df.get("state_code", 0),
+        }).astype({"trust_score": float, "state_code": int})
+
+        self._batch_write(
+            """
+            UNWIND $rows AS row
+            MERGE (t:Taxpayer {gstin: row.gstin})
+            SET t.legal_name = row.legal_name,
+                t.status = row.status,
+                t.trust_score = row.trust_score,
+                t.state_code = row.state_code
+            """,
+            rows.to_dict("records"),
+        )
+
+    def _write_invoices(self, df: pd.DataFrame):
+        """MERGE an INVOICE edge per row with both GSTINs present, WRITE_BATCH_SIZE rows per query."""
+        if "supplier_gstin" not in df.columns or "receiver_gstin" not in df.columns:
+            return
+        df = df.dropna(subset=["supplier_gstin", "receiver_gstin"])
+        rows = pd.DataFrame({
+            "supplier": df["supplier_gstin"],
+            "receiver": df["receiver_gstin"],
+            "invoice_id": df.get("invoice_id"),
+            "total_value": df.get("total_value", 0),
+            "tax_amount": df.get("tax_amount", 0),
+        }).astype({"total_value": float, "tax_amount": float})
+
+        self._batch_write(
+            """
+            UNWIND $rows AS row
+            MERGE (s:Taxpayer {gstin: row.supplier})
+            MERGE (r:Taxpayer {gstin: row.receiver})
+            MERGE (s)-[inv:INVOICE {invoice_id: row.invoice_id}]->(r)
+            SET inv.total_value = row.total_value,
+                inv.tax_amount = row.tax_amount
+            """,
+            rows.to_dict("records"),
+        )
+
+    def _batch_write(self, cypher: str, rows: list, chunk: int = WRITE_BATCH_SIZE):
+        """Run an UNWIND $rows write query over rows, chunk rows per round-trip."""
+        for start in range(0, len(rows), chunk):
+            run_write_query(cypher, {"rows": rows[start:start + chunk]})
+
     # ──────────────────────────────────────────────
     # Public: Get graph counts (replaces len(self.graph.nodes/edges))
     # ──────────────────────────────────────────────
@@ -257,13 +261,21 @@ class GSTIngestionService:
         if existing_keys:
             df = df.drop_duplicates(subset=existing_keys, keep="first")
 
-        # Validate GSTIN length where applicable
+        # Validate GSTIN length where applicable: one combined mask, one slice
         gstin_cols = [c for c in df.columns if "gstin" in c.lower()]
+        invalid = np.zeros(len(df), dtype=bool)
+        bad_cols = []
         for col in gstin_cols:
-            df[col] = df[col].astype(str).str.strip()
-            invalid = df[col].str.len() != 15
-            if invalid.any():
-                print(f"⚠️  {invalid.sum()} invalid GSTINs in '{col}' — removing them")
-                df = df[~invalid]
+            values = df[col]
+            if not isinstance(values.dtype, pd.StringDtype):
+                values = values.astype(str)  # string columns are already str, skip the extra copy
+            df[col] = values = values.str.strip()
+            col_invalid = (values.str.len() != 15).to_numpy(dtype=bool)
+            if col_invalid.any():
+                bad_cols.append(col)
+                invalid |= col_invalid
+        if bad_cols:
+            print(f"⚠️  {invalid.sum()} rows with invalid GSTINs in {bad_cols} — removing them")
+            df = df[~invalid]
 
         return df.reset_index(drop=True)
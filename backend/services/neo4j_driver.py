@@ -58,6 +58,18 @@ def run_read_query(cypher: str, parameters: dict = None) -> list[dict]:
     return run_query(cypher, parameters, write=False)
 
 
+def run_read_stream(cypher: str, parameters: dict = None):
+    """
+    Execute a read Cypher query and yield record dicts as they arrive,
+    instead of materializing the whole result list first.
+    """
+    driver = get_driver()
+    with driver.session() as session:
+        result = session.run(cypher, parameters or {})
+        for record in result:
+            yield record.data()
+
+
 def health_check() -> bool:
     """Verify Neo4j connection is alive."""
     try:
@@ -97,6 +109,31 @@ def get_node_count() -> int:
     return result[0]["cnt"] if result else 0
 
 
+def get_invoice_degrees(gstins: list) -> dict:
+    """
+    In- and out-degree over INVOICE edges for many GSTINs in one round-trip
+    (UNWIND batch). Returns gstin → (in_degree, out_degree); unknown GSTINs get (0, 0).
+    """
+    degrees = dict.fromkeys(gstins, (0, 0))
+    if not degrees:
+        return degrees
+    result = run_read_query(
+        """
+        UNWIND $gstins AS g
+        MATCH (t:Taxpayer {gstin: g})
+        RETURN g AS gstin,
+               COUNT { ()-[:INVOICE]->(t) } AS in_degree,
+               COUNT { (t)-[:INVOICE]->() } AS out_degree
+        """,
+        {"gstins": list(degrees)},
+    )
+    # Sum over rows so duplicate Taxpayer nodes for a GSTIN count like a per-GSTIN MATCH
+    for r in result:
+        in_deg, out_deg = degrees[r["gstin"]]
+        degrees[r["gstin"]] = (in_deg + r["in_degree"], out_deg + r["out_degree"])
+    return degrees
+
+
 def get_edge_count() -> int:
     """Get total number of INVOICE relationships."""
     result = run_read_query("MATCH ()-[r:INVOICE]->() RETURN count(r) AS cnt")
@@ -6,9 +6,10 @@ features from DataFrames + Neo4j graph metrics (Cypher queries).
 import networkx as nx
 import pandas as pd
 from services.neo4j_driver import run_read_query
+from services.taxpayer_lookup import TaxpayerLookupMixin
 
 
-class RiskScoringEngine:
+class RiskScoringEngine(TaxpayerLookupMixin):
     """Compute risk scores using graph features + filing behavior."""
 
     def __init__(self, gstr1_df: pd.DataFrame,
@@ -34,43 +35,17 @@ class RiskScoringEngine:
 
                 # Build lightweight in-memory graph for PageRank
                 G = nx.DiGraph()
-                for edge in edges:
-                    G.add_edge(edge["src"], edge["dst"])
+                G.add_edges_from((edge["src"], edge["dst"]) for edge in edges)
 
                 # Add isolated nodes
                 nodes = run_read_query("MATCH (t:Taxpayer) RETURN t.gstin AS gstin")
-                for node in nodes:
-                    G.add_node(node["gstin"])
+                G.add_nodes_from(node["gstin"] for node in nodes)
 
                 self._pagerank = nx.pagerank(G, alpha=0.85, max_iter=100)
             except Exception:
                 self._pagerank = {}
         return self._pagerank
 
-    def _get_in_degree(self, gstin: str) -> int:
-        """Get in-degree of a GSTIN from Neo4j."""
-        result = run_read_query(
-            "MATCH ()-[r:INVOICE]->(t:Taxpayer {gstin: $gstin}) RETURN count(r) AS cnt",
-            {"gstin": gstin},
-        )
-        return result[0]["cnt"] if result else 0
-
-    def _get_out_degree(self, gstin: str) -> int:
-        """Get out-degree of a GSTIN from Neo4j."""
-        result = run_read_query(
-            "MATCH (t:Taxpayer {gstin: $gstin})-[r:INVOICE]->() RETURN count(r) AS cnt",
-            {"gstin": gstin},
-        )
-        return result[0]["cnt"] if result else 0
-
-    def _node_exists(self, gstin: str) -> bool:
-        """Check if a GSTIN exists as a Taxpayer node in Neo4j."""
-        result = run_read_query(
-            "MATCH (t:Taxpayer {gstin: $gstin}) RETURN count(t) AS cnt",
-            {"gstin": gstin},
-        )
-        return result[0]["cnt"] > 0 if result else False
-
     def _get_all_gstins(self) -> list[str]:
         """Get all Taxpayer GSTINs from Neo4j."""
         result = run_read_query("MATCH (t:Taxpayer) RETURN t.gstin AS gstin")
@@ -83,13 +58,12 @@ class RiskScoringEngine:
         # 1. Graph features (from Neo4j)
         pagerank = self._get_pagerank()
         features["pagerank_score"] = round(pagerank.get(gstin, 0), 6)
-        features["in_degree"] = self._get_in_degree(gstin) if self._node_exists(gstin) else 0
-        features["out_degree"] = self._get_out_degree(gstin) if self._node_exists(gstin) else 0
+        features["in_degree"], features["out_degree"] = self._get_degrees([gstin])[gstin]
 
         # 2. Invoice features
         if not self.gstr1.empty:
-            seller_inv = self.gstr1[self.gstr1["supplier_gstin"] == gstin]
-            buyer_inv = self.gstr1[self.gstr1["receiver_gstin"] == gstin]
+            seller_inv = self._rows_for("gstr1", "supplier_gstin", gstin)
+            buyer_inv = self._rows_for("gstr1", "receiver_gstin", gstin)
             features["total_invoices_issued"] = len(seller_inv)
             features["total_invoices_received"] = len(buyer_inv)
             features["total_outward_value"] = round(float(seller_inv["total_value"].sum()), 2)
@@ -102,7 +76,7 @@ class RiskScoringEngine:
 
         # 3. GSTR-3B features
         if not self.gstr3b.empty:
-            filings = self.gstr3b[self.gstr3b["gstin"] == gstin]
+            filings = self._rows_for("gstr3b", "gstin", gstin)
             features["filing_count"] = len(filings)
 
             if not filings.empty:
@@ -134,7 +108,7 @@ class RiskScoringEngine:
 
         # 4. Known fraud label
         if not self.fraud_labels.empty:
-            label_row = self.fraud_labels[self.fraud_labels["gstin"] == gstin]
+            label_row = self._rows_for("fraud_labels", "gstin", gstin)
             if not label_row.empty:
                 features["is_known_fraud"] = int(label_row.iloc[0].get("is_fraud", 0))
                 features["fraud_type"] = str(label_row.iloc[0].get("fraud_type", "None"))
@@ -212,6 +186,9 @@ class RiskScoringEngine:
         if not all_gstins:
             return []
 
+        # One UNWIND round-trip for every node's degrees instead of several queries per GSTIN
+        self._get_degrees(all_gstins)
+
         results = []
 
         for gstin in all_gstins:
@@ -0,0 +1,33 @@
+"""
+TaxpayerLookupMixin — Per-GSTIN lookups shared by the risk and XGBoost engines.
+Caches are created on first use, so engines need no extra setup in __init__.
+"""
+
+import pandas as pd
+from services.neo4j_driver import get_invoice_degrees
+
+
+class TaxpayerLookupMixin:
+    """Cached per-GSTIN row lookups and Neo4j invoice degrees."""
+
+    _row_index = None  # (attr, col) → {value: rows}, built on first lookup
+    _degrees = None  # gstin → (in_degree, out_degree), filled in batches
+
+    def _rows_for(self, attr: str, col: str, value) -> pd.DataFrame:
+        """Rows of DataFrame `attr` where `col` == value, via a cached one-pass groupby index."""
+        if self._row_index is None:
+            self._row_index = {}
+        df = getattr(self, attr)
+        key = (attr, col)
+        if key not in self._row_index:
+            self._row_index[key] = dict(iter(df.groupby(col, sort=False)))
+        return self._row_index[key].get(value, df.iloc[0:0])
+
+    def _get_degrees(self, gstins: list) -> dict:
+        """In/out degree per GSTIN from Neo4j, fetched in one batch for any not cached yet."""
+        if self._degrees is None:
+            self._degrees = {}
+        missing = [g for g in gstins if g not in self._degrees]
+        if missing:
+            self._degrees.update(get_invoice_degrees(missing))
+        return {g: self._degrees[g] for g in gstins}
@@ -13,6 +13,7 @@ from sklearn.metrics import (
     confusion_matrix, classification_report,
 )
 from services.neo4j_driver import run_read_query
+from services.taxpayer_lookup import TaxpayerLookupMixin
 import networkx as nx
 
 
@@ -37,7 +38,7 @@ FEATURE_COLUMNS = [
 ]
 
 
-class XGBoostFraudClassifier:
+class XGBoostFraudClassifier(TaxpayerLookupMixin):
     """XGBoost-based fraud classifier for GST taxpayers."""
 
     def __init__(self, gstr1_df: pd.DataFrame, gstr2b_df: pd.DataFrame,
@@ -64,27 +65,13 @@ class XGBoostFraudClassifier:
             )
             nodes = run_read_query("MATCH (t:Taxpayer) RETURN t.gstin AS gstin")
             G = nx.DiGraph()
-            for e in edges:
-                G.add_edge(e["src"], e["dst"])
-            for n in nodes:
-                G.add_node(n["gstin"])
+            G.add_edges_from((e["src"], e["dst"]) for e in edges)
+            G.add_nodes_from(n["gstin"] for n in nodes)
             self._pagerank = nx.pagerank(G, alpha=0.85, max_iter=100)
         except Exception:
             self._pagerank = {}
         return self._pagerank
 
-    def _get_degree(self, gstin: str) -> tuple:
-        """Get in-degree and out-degree from Neo4j."""
-        in_result = run_read_query(
-            "MATCH ()-[:INVOICE]->(t:Taxpayer {gstin:$g}) RETURN count(*) AS c", {"g": gstin}
-        )
-        out_result = run_read_query(
-            "MATCH (t:Taxpayer {gstin:$g})-[:INVOICE]->() RETURN count(*) AS c", {"g": gstin}
-        )
-        in_deg = in_result[0]["c"] if in_result else 0
-        out_deg = out_result[0]["c"] if out_result else 0
-        return in_deg, out_deg
-
     def extract_features(self, gstin: str) -> dict:
         """Extract all ML features for a GSTIN."""
         f = {}
@@ -92,14 +79,14 @@ class XGBoostFraudClassifier:
         # Graph features
         pr = self._compute_pagerank()
         f["pagerank_score"] = float(pr.get(gstin, 0))
-        in_deg, out_deg = self._get_degree(gstin)
+        in_deg, out_deg = self._get_degrees([gstin])[gstin]
         f["in_degree"] = in_deg
         f["out_degree"] = out_deg
 
         # Invoice features
         if not self.gstr1.empty:
-            seller = self.gstr1[self.gstr1["supplier_gstin"] == gstin]
-            buyer = self.gstr1[self.gstr1["receiver_gstin"] == gstin]
+            seller = self._rows_for("gstr1", "supplier_gstin", gstin)
+            buyer = self._rows_for("gstr1", "receiver_gstin", gstin)
             f["total_invoices_issued"] = len(seller)
             f["total_invoices_received"] = len(buyer)
             f["total_outward_value"] = float(seller["total_value"].sum())
@@ -114,7 +101,7 @@ class XGBoostFraudClassifier:
 
         # GSTR-3B features
         if not self.gstr3b.empty:
-            filings = self.gstr3b[self.gstr3b["gstin"] == gstin]
+            filings = self._rows_for("gstr3b", "gstin", gstin)
             f["filing_count"] = len(filings)
             if not filings.empty:
                 itc = float(filings["total_itc_claimed"].sum()) if "total_itc_claimed" in filings.columns else 0
@@ -156,6 +143,8 @@ class XGBoostFraudClassifier:
         X_rows = []
         y = []
 
+        self._get_degrees(list(self.fraud_labels["gstin"]))  # one batched degree query
+
         for _, row in self.fraud_labels.iterrows():
             gstin = row["gstin"]
             label = int(row.get("is_fraud", 0))
@@ -303,6 +292,8 @@ class XGBoostFraudClassifier:
         if not all_gstins:
             return {"predictions": [], "model_metrics": self.metrics}
 
+        self._get_degrees([record["gstin"] for record in all_gstins])  # one batched degree query
+
         predictions = []
         for record in all_gstins:
             pred = self.predict(record["gstin"])
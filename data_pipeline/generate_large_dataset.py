@@ -3,16 +3,23 @@ generate_large_dataset.py — Generate a larger synthetic dataset (200 taxpayers
 with realistic fraud patterns for robust XGBoost training.
 Produces: taxpayers.csv, gstr1_invoices.csv, gstr2b_invoices.csv,
           gstr3b_summary.csv, fraud_labels.csv
+Set OUTPUT_FORMAT = "parquet" to write everything except fraud_labels.csv
+as Parquet for machine-only consumers.
 """
 
 import pandas as pd
 import numpy as np
-import random
 import string
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-random.seed(42)
-np.random.seed(42)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+rng = np.random.default_rng(42)
 
 # ─── Configuration ───
 NUM_TAXPAYERS = 200
@@ -20,7 +27,11 @@ NUM_INVOICES = 800
 NUM_FRAUD_CIRCULAR = 12  # 3 rings of 4
 NUM_FRAUD_SHELL = 8
 NUM_FRAUD_FAKE_ITC = 6
+CIRCULAR_VALUE_FLOOR = 2_000_000  # ring invoices are drawn at or above this value
+WRITE_BUFFER_SIZE = 1 << 20  # 1 MiB file buffer for CSV output
+OUTPUT_FORMAT = "csv"  # the upload API expects CSV; "parquet" needs pyarrow
 STATES = [27, 29, 7, 33, 9, 6, 24, 21, 19, 36]
+GST_RATE = 0.18
 
 COMPANY_TYPES = [
     "Industries Pvt Ltd", "Exports Ltd", "Trading Co", "Enterprises",
@@ -40,17 +51,112 @@ CITY_NAMES = [
 ]
 
 
-def random_pan():
-    """Generate a random PAN-like string."""
-    return ''.join(random.choices(string.ascii_uppercase, k=5)) + \
-        ''.join(random.choices(string.digits, k=4)) + \
-        random.choice(string.ascii_uppercase)
-
-
-def generate_gstin(state_code):
-    """Generate a valid-format GSTIN."""
-    pan = random_pan()
-    return f"{state_code:02d}{pan}1Z{random.choice(string.ascii_uppercase)}"
+LETTERS = np.array(list(string.ascii_uppercase))
+DIGITS = np.array(list(string.digits))
+
+
+def generate_gstins(state_codes):
+    """Generate valid-format GSTINs for an array of state codes in one vectorized pass."""
+    n = len(state_codes)
+    pan_alpha = LETTERS[rng.integers(0, 26, (n, 5))].view("U5").ravel()
+    pan_digits = DIGITS[rng.integers(0, 10, (n, 4))].view("U4").ravel()
+    pan_check = LETTERS[rng.integers(0, 26, n)]
+    checksum = LETTERS[rng.integers(0, 26, n)]
+
+    gstins = np.char.zfill(np.asarray(state_codes).astype(str), 2)
+    gstins = np.char.add(gstins, pan_alpha)
+    gstins = np.char.add(gstins, pan_digits)
+    gstins = np.char.add(gstins, pan_check)
+    gstins = np.char.add(gstins, "1Z")
+    return np.char.add(gstins, checksum)
+
+
+def draw_counterparties(n_taxpayers, exclude_idx, size):
+    """Draw `size` taxpayer indices, redrawing only those that collide with `exclude_idx`."""
+    picks = rng.integers(0, n_taxpayers, size)
+    clash = picks == exclude_idx
+    while clash.any():
+        picks[clash] = rng.integers(0, n_taxpayers, clash.sum())
+        clash = picks == exclude_idx
+    return picks
+
+
+def strongly_connected_components(n_nodes, src, dst):
+    """
+    Tarjan's SCC algorithm over a CSR adjacency built from edge arrays.
+    Runs in O(V + E) with an explicit work stack instead of recursion.
+    """
+    order = np.argsort(src, kind="stable")
+    targets = dst[order].tolist()
+    offsets = np.searchsorted(src[order], np.arange(n_nodes + 1)).tolist()
+
+    index = [-1] * n_nodes
+    lowlink = [0] * n_nodes
+    on_stack = [False] * n_nodes
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(n_nodes):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, offsets[root]]]
+
+        while work:
+            frame = work[-1]
+            v, edge = frame
+            if edge < offsets[v + 1]:
+                frame[1] += 1
+                w = targets[edge]
+                if index[w] == -1:
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, offsets[w]])
+                elif on_stack[w]:
+                    lowlink[v] = min(lowlink[v], index[w])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[v])
+            if lowlink[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+
+    return components
+
+
+def write_csv(df, path):
+    """Write a DataFrame as CSV, using pyarrow's C++ writer when it is installed."""
+    if pa is None:
+        with open(path, "w", buffering=WRITE_BUFFER_SIZE, newline="") as f:
+            df.to_csv(f, index=False)
+        return
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def write_table(df, base_dir, name):
+    """Write a generated table as `name` in OUTPUT_FORMAT."""
+    if OUTPUT_FORMAT == "parquet":
+        df.to_parquet(
+            os.path.join(base_dir, f"{name}.parquet"),
+            engine="pyarrow", compression="snappy", index=False,
+        )
+    else:
+        write_csv(df, os.path.join(base_dir, f"{name}.csv"))
 
 
 def main():
@@ -59,203 +165,171 @@ def main():
     base_dir = os.path.dirname(os.path.abspath(__file__))
 
     # ─── Step 1: Generate Taxpayers ───
-    taxpayers = []
-    for i in range(NUM_TAXPAYERS):
-        state = random.choice(STATES)
-        city = random.choice(CITY_NAMES)
-        ctype = random.choice(COMPANY_TYPES)
-        taxpayers.append({
-            "gstin": generate_gstin(state),
-            "legal_name": f"{city} {ctype}",
-            "registration_date": f"20{random.randint(16, 24):02d}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-            "status": random.choices(["Active", "Suspended"], weights=[92, 8])[0],
-            "state_code": state,
-            "trust_score": round(random.uniform(0.3, 0.95), 2),
-        })
+    states = rng.choice(STATES, NUM_TAXPAYERS)
+    reg_start = np.datetime64("2016-01-01")
+    reg_span_days = (np.datetime64("2024-12-29") - reg_start).astype(int)
+    reg_offsets = rng.integers(0, reg_span_days, NUM_TAXPAYERS).astype("timedelta64[D]")
+    reg_dates = np.datetime_as_string(reg_start + reg_offsets)
+    gstin_arr = generate_gstins(states)
+    legal_names = np.char.add(
+        np.char.add(rng.choice(CITY_NAMES, NUM_TAXPAYERS), " "),
+        rng.choice(COMPANY_TYPES, NUM_TAXPAYERS),
+    )
+    statuses = rng.choice(["Active", "Suspended"], NUM_TAXPAYERS, p=[0.92, 0.08])
+    trust_scores = np.round(rng.uniform(0.3, 0.95, NUM_TAXPAYERS), 2)
 
     # ─── Step 2: Designate fraud entities ───
-    fraud_labels = []
-
-    # Circular trading rings (3 rings of 4 entities)
-    circular_gstins = set()
+    # Circular trading rings (3 rings of 4 entities) are labelled from the
+    # invoice graph once it exists, see the end of Step 3
     ring_starts = [0, 4, 8]
-    for ring_idx, start in enumerate(ring_starts):
-        ring = taxpayers[start: start + 4]
-        for t in ring:
-            circular_gstins.add(t["gstin"])
-            fraud_labels.append({
-                "gstin": t["gstin"],
-                "is_fraud": 1,
-                "fraud_type": "Circular Trading",
-            })
-
-    # Shell companies
-    shell_gstins = set()
-    for i in range(12, 12 + NUM_FRAUD_SHELL):
-        shell_gstins.add(taxpayers[i]["gstin"])
-        fraud_labels.append({
-            "gstin": taxpayers[i]["gstin"],
-            "is_fraud": 1,
-            "fraud_type": "Shell Company",
-        })
-
-    # Fake ITC claimers
-    fake_itc_gstins = set()
-    for i in range(20, 20 + NUM_FRAUD_FAKE_ITC):
-        fake_itc_gstins.add(taxpayers[i]["gstin"])
-        fraud_labels.append({
-            "gstin": taxpayers[i]["gstin"],
-            "is_fraud": 1,
-            "fraud_type": "Fake ITC",
-        })
-
-    # Clean taxpayers
-    all_fraud_gstins = circular_gstins | shell_gstins | fake_itc_gstins
-    for t in taxpayers:
-        if t["gstin"] not in all_fraud_gstins:
-            fraud_labels.append({
-                "gstin": t["gstin"],
-                "is_fraud": 0,
-                "fraud_type": "None",
-            })
-
-    # ─── Step 3: Generate GSTR-1 Invoices ───
-    invoices = []
-    invoice_counter = 1
+    shell_idx = range(12, 12 + NUM_FRAUD_SHELL)
+    fake_itc_idx = range(20, 20 + NUM_FRAUD_FAKE_ITC)
 
+    # ─── Step 3: Generate GSTR-1 Invoices (column-wise) ───
     # Normal invoices between random taxpayers
-    for _ in range(NUM_INVOICES):
-        seller = random.choice(taxpayers)
-        buyer = random.choice(taxpayers)
-        while buyer["gstin"] == seller["gstin"]:
-            buyer = random.choice(taxpayers)
-
-        base_value = round(random.uniform(50_000, 800_000), 2)
-        tax = round(base_value * 0.18, 2)
-
-        invoices.append({
-            "invoice_id": f"INV-2024-{invoice_counter:04d}",
-            "supplier_gstin": seller["gstin"],
-            "receiver_gstin": buyer["gstin"],
-            "total_value": base_value,
-            "tax_amount": tax,
-        })
-        invoice_counter += 1
+    seller_idx = rng.integers(0, NUM_TAXPAYERS, NUM_INVOICES)
+    supplier_blocks = [seller_idx]
+    receiver_blocks = [draw_counterparties(NUM_TAXPAYERS, seller_idx, NUM_INVOICES)]
+    value_blocks = [np.round(rng.uniform(50_000, 800_000, NUM_INVOICES), 2)]
 
     # Inject circular trading invoices (high value, round numbers)
     for ring_start in ring_starts:
-        ring = taxpayers[ring_start: ring_start + 4]
-        for j in range(len(ring)):
-            value = round(random.uniform(2_000_000, 5_000_000), 2)
-            tax = round(value * 0.18, 2)
-            invoices.append({
-                "invoice_id": f"INV-2024-{invoice_counter:04d}",
-                "supplier_gstin": ring[j]["gstin"],
-                "receiver_gstin": ring[(j + 1) % len(ring)]["gstin"],
-                "total_value": value,
-                "tax_amount": tax,
-            })
-            invoice_counter += 1
+        ring = np.arange(ring_start, ring_start + 4)
+        supplier_blocks.append(ring)
+        receiver_blocks.append(np.roll(ring, -1))
+        value_blocks.append(np.round(rng.uniform(2_000_000, 5_000_000, len(ring)), 2))
 
     # Inject shell company invoices (high volume from few sources)
-    for gstin in shell_gstins:
-        for _ in range(random.randint(8, 15)):
-            buyer = random.choice(taxpayers)
-            while buyer["gstin"] == gstin:
-                buyer = random.choice(taxpayers)
-            value = round(random.uniform(1_000_000, 3_000_000), 2)
-            tax = round(value * 0.18, 2)
-            invoices.append({
-                "invoice_id": f"INV-2024-{invoice_counter:04d}",
-                "supplier_gstin": gstin,
-                "receiver_gstin": buyer["gstin"],
-                "total_value": value,
-                "tax_amount": tax,
-            })
-            invoice_counter += 1
+    for idx in shell_idx:
+        n = rng.integers(8, 16)
+        supplier_blocks.append(np.full(n, idx))
+        receiver_blocks.append(draw_counterparties(NUM_TAXPAYERS, idx, n))
+        value_blocks.append(np.round(rng.uniform(1_000_000, 3_000_000, n), 2))
 
     # Inject fake ITC claimers (receive large amounts, no corresponding sales)
-    for gstin in fake_itc_gstins:
-        for _ in range(random.randint(5, 10)):
-            seller = random.choice(taxpayers)
-            while seller["gstin"] == gstin:
-                seller = random.choice(taxpayers)
-            value = round(random.uniform(500_000, 2_000_000), 2)
-            tax = round(value * 0.18, 2)
-            invoices.append({
-                "invoice_id": f"INV-2024-{invoice_counter:04d}",
-                "supplier_gstin": seller["gstin"],
-                "receiver_gstin": gstin,
-                "total_value": value,
-                "tax_amount": tax,
-            })
-            invoice_counter += 1
+    for idx in fake_itc_idx:
+        n = rng.integers(5, 11)
+        supplier_blocks.append(draw_counterparties(NUM_TAXPAYERS, idx, n))
+        receiver_blocks.append(np.full(n, idx))
+        value_blocks.append(np.round(rng.uniform(500_000, 2_000_000, n), 2))
+
+    # GSTIN columns are categorical over the taxpayer list: int codes + one dictionary
+    gstin_dtype = pd.CategoricalDtype(gstin_arr)
+    supplier_idx = np.concatenate(supplier_blocks)
+    receiver_idx = np.concatenate(receiver_blocks)
+    total_value = np.concatenate(value_blocks)
+    df_gstr1 = pd.DataFrame({
+        "invoice_id": np.char.add(
+            "INV-2024-", np.char.zfill(np.arange(1, len(total_value) + 1).astype(str), 4)
+        ),
+        "supplier_gstin": pd.Categorical.from_codes(supplier_idx, dtype=gstin_dtype),
+        "receiver_gstin": pd.Categorical.from_codes(receiver_idx, dtype=gstin_dtype),
+        "total_value": total_value,
+        "tax_amount": np.round(total_value * GST_RATE, 2),
+    })
+
+    # Label circular traders structurally: every member of a non-trivial SCC
+    # in the high-value invoice graph sits on a closed trading loop
+    high_value = total_value >= CIRCULAR_VALUE_FLOOR
+    components = strongly_connected_components(
+        NUM_TAXPAYERS, supplier_idx[high_value], receiver_idx[high_value]
+    )
+    circular_idx = sorted(v for component in components if len(component) >= 2 for v in component)
+
+    # Every taxpayer starts clean; later assignments win, so a GSTIN on a
+    # trading loop is labelled circular even if it was also seeded as a shell
+    fraud_type = np.full(NUM_TAXPAYERS, "None", dtype=object)
+    fraud_type[fake_itc_idx] = "Fake ITC"
+    fraud_type[shell_idx] = "Shell Company"
+    fraud_type[circular_idx] = "Circular Trading"
+    is_fraud = fraud_type != "None"
+
+    df_fraud = pd.DataFrame({
+        "gstin": gstin_arr,
+        "is_fraud": is_fraud.astype(int),
+        "fraud_type": fraud_type,
+    })
 
     # ─── Step 4: Generate GSTR-2B (mirror of received invoices) ───
-    gstr2b = []
-    for inv in invoices:
-        gstr2b.append({
-            "invoice_id": inv["invoice_id"],
-            "supplier_gstin": inv["supplier_gstin"],
-            "receiver_gstin": inv["receiver_gstin"],
-            "total_value": inv["total_value"],
-            "itc_available": inv["tax_amount"],
-        })
+    gstr2b_value = df_gstr1["total_value"].to_numpy().copy()
 
     # Inject mismatches (5% of invoices have value differences)
-    mismatch_count = int(len(gstr2b) * 0.05)
-    for idx in random.sample(range(len(gstr2b)), mismatch_count):
-        gstr2b[idx]["total_value"] = round(gstr2b[idx]["total_value"] * random.uniform(0.9, 1.1), 2)
+    mismatch_count = int(len(gstr2b_value) * 0.05)
+    mismatch_idx = rng.choice(len(gstr2b_value), mismatch_count, replace=False)
+    gstr2b_value[mismatch_idx] = np.round(
+        gstr2b_value[mismatch_idx] * rng.uniform(0.9, 1.1, mismatch_count), 2
+    )
+
+    df_gstr2b = pd.DataFrame({
+        "invoice_id": df_gstr1["invoice_id"].to_numpy(),
+        "supplier_gstin": df_gstr1["supplier_gstin"].array,
+        "receiver_gstin": df_gstr1["receiver_gstin"].array,
+        "total_value": gstr2b_value,
+        "itc_available": df_gstr1["tax_amount"].to_numpy(),
+    })
 
     # ─── Step 5: Generate GSTR-3B (monthly summaries) ───
-    gstr3b = []
-    for t in taxpayers:
-        gstin = t["gstin"]
-
-        # Sum outward supply
-        outward_invoices = [inv for inv in invoices if inv["supplier_gstin"] == gstin]
-        total_sales = sum(inv["total_value"] for inv in outward_invoices)
-
-        # Sum ITC available
-        inward_invoices = [inv for inv in invoices if inv["receiver_gstin"] == gstin]
-        total_itc = sum(inv["tax_amount"] for inv in inward_invoices)
-
-        # Fraud entities: claim more ITC, pay less cash
-        if gstin in all_fraud_gstins:
-            itc_claimed = round(total_itc * random.uniform(1.3, 2.0), 2)
-            cash_paid = 0.0
-        else:
-            itc_claimed = round(total_itc * random.uniform(0.85, 1.0), 2)
-            cash_paid = round(max(total_sales * 0.18 - itc_claimed, 0) * random.uniform(0.8, 1.0), 2)
-
-        gstr3b.append({
-            "gstin": gstin,
-            "return_period": "2024-01",
-            "total_sales_declared": round(total_sales, 2),
-            "total_itc_claimed": itc_claimed,
-            "tax_paid_cash": cash_paid,
-        })
+    # One pass per side over the categorical codes; unobserved GSTINs sum to 0
+    # and the result is already in taxpayer order
+    total_sales = (
+        df_gstr1.groupby("supplier_gstin", observed=False)["total_value"].sum().to_numpy()
+    )
+    total_itc = (
+        df_gstr1.groupby("receiver_gstin", observed=False)["tax_amount"].sum().to_numpy()
+    )
+
+    # Fraud entities: claim more ITC, pay less cash
+    itc_claimed = np.round(total_itc * np.where(
+        is_fraud,
+        rng.uniform(1.3, 2.0, NUM_TAXPAYERS),
+        rng.uniform(0.85, 1.0, NUM_TAXPAYERS),
+    ), 2)
+    cash_paid = np.where(
+        is_fraud,
+        0.0,
+        np.round(np.maximum(total_sales * GST_RATE - itc_claimed, 0) * rng.uniform(0.8, 1.0, NUM_TAXPAYERS), 2),
+    )
+
+    df_gstr3b = pd.DataFrame({
+        "gstin": gstin_arr,
+        "return_period": "2024-01",
+        "total_sales_declared": np.round(total_sales, 2),
+        "total_itc_claimed": itc_claimed,
+        "tax_paid_cash": cash_paid,
+    })
 
     # ─── Step 6: Save all CSVs ───
-    df_taxpayers = pd.DataFrame(taxpayers)
-    df_gstr1 = pd.DataFrame(invoices)
-    df_gstr2b = pd.DataFrame(gstr2b)
-    df_gstr3b = pd.DataFrame(gstr3b)
-    df_fraud = pd.DataFrame(fraud_labels)
-
-    df_taxpayers.to_csv(os.path.join(base_dir, "taxpayers.csv"), index=False)
-    df_gstr1.to_csv(os.path.join(base_dir, "gstr1_invoices.csv"), index=False)
-    df_gstr2b.to_csv(os.path.join(base_dir, "gstr2b_invoices.csv"), index=False)
-    df_gstr3b.to_csv(os.path.join(base_dir, "gstr3b_summary.csv"), index=False)
-    df_fraud.to_csv(os.path.join(base_dir, "fraud_labels.csv"), index=False)
+    df_taxpayers = pd.DataFrame({
+        "gstin": gstin_arr,
+        "legal_name": legal_names,
+        "registration_date": reg_dates,
+        "status": statuses,
+        "state_code": states,
+        "trust_score": trust_scores,
+    })
+
+    # Tables are independent; pyarrow and the OS release the GIL while
+    # encoding and writing, so the writes overlap
+    tables = [
+        (df_taxpayers, "taxpayers"),
+        (df_gstr1, "gstr1_invoices"),
+        (df_gstr2b, "gstr2b_invoices"),
+        (df_gstr3b, "gstr3b_summary"),
+    ]
+    with ThreadPoolExecutor(max_workers=len(tables) + 1) as pool:
+        futures = [pool.submit(write_table, df, base_dir, name) for df, name in tables]
+        # Labels stay CSV regardless of OUTPUT_FORMAT so they can be inspected by hand
+        futures.append(pool.submit(write_csv, df_fraud, os.path.join(base_dir, "fraud_labels.csv")))
+        for future in futures:
+            future.result()
 
     print(f"✅ Generated:")
-    print(f"   📋 {len(df_taxpayers)} taxpayers ({len(all_fraud_gstins)} fraud, {len(df_taxpayers) - len(all_fraud_gstins)} clean)")
+    print(f"   📋 {len(df_taxpayers)} taxpayers ({is_fraud.sum()} fraud, {len(df_taxpayers) - is_fraud.sum()} clean)")
     print(f"   📑 {len(df_gstr1)} GSTR-1 invoices")
     print(f"   📑 {len(df_gstr2b)} GSTR-2B invoices ({mismatch_count} mismatches)")
     print(f"   📊 {len(df_gstr3b)} GSTR-3B summaries")
     print(f"   🏷️  {len(df_fraud)} fraud labels")
-    print(f"   📂 Saved to: {base_dir}")
+    print(f"   📂 Saved to: {base_dir} ({OUTPUT_FORMAT})")
 
 
 if __name__ == "__main__":